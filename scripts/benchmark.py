@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+"""
+Measure how long workspace_bookmark takes in synthetic workspaces.
+
+Every scenario builds a workspace in a temporary directory and measures
+get_bookmarked_path, each of its phases, path_to and a full g round trip in
+bash. Measurements are done with caches disabled (cold) and with caches filled
+by a previous call (warm). Next to the median time every measurement reports
+the number of file system calls made per call.
+
+Results are compared to the baseline, if there is one, and can be stored as the
+new baseline with --save-baseline.
+
+Usage: scripts/benchmark.py [--scale 0.1] [--repeat 20] [--save-baseline]
+"""
+
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repository, "src"))
+
+# pylint: disable=wrong-import-position
+import workspace_bookmark  # noqa: E402
+import workspace_bookmark_cache  # noqa: E402
+
+# File system calls counted during measurements. os.path.isdir and friends end up
+# in os.stat.
+SYSCALLS = (
+    (os, "listdir"),
+    (os, "scandir"),
+    (os, "stat"),
+    (os, "lstat"),
+    (builtins, "open"),
+)
+# A single environment variable can't be longer than that on Linux.
+MAX_ENVIRONMENT_VARIABLE = 131072
+# Slow down by more than that compared to the baseline is reported.
+REGRESSION = 1.25
+
+
+@contextlib.contextmanager
+def counted_syscalls():
+    """Count calls to SYSCALLS made inside of the with statement."""
+    counts = {}
+    originals = [(module, name, getattr(module, name)) for module, name in SYSCALLS]
+
+    def counting(name, original):
+        def call(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return original(*args, **kwargs)
+
+        return call
+
+    for module, name, original in originals:
+        setattr(module, name, counting(name, original))
+    try:
+        yield counts
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+
+def clear_memory_caches():
+    """Make the next call behave like the first one in a new process."""
+    workspace_bookmark_cache.bookmark_table.cache_clear()
+    workspace_bookmark_cache.root_cache.cache_clear()
+    workspace_bookmark.compile_pattern.cache_clear()
+
+
+def measure(function, repeat):
+    """Return the median time of a call in microseconds and its syscall counts."""
+    times = []
+    for _ in range(repeat):
+        clear_memory_caches()
+        with counted_syscalls() as counts:
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+    return {"us": statistics.median(times) * 1e6, "syscalls": counts}
+
+
+def touch_many(directory, count):
+    """Fill a directory with count empty files."""
+    for number in range(count):
+        with open(os.path.join(directory, f"entry{number}"), "w", encoding="UTF-8"):
+            pass
+
+
+def make_deep(root, scale):
+    """A workspace with the current directory 48 levels below the root."""
+    del scale
+    os.makedirs(os.path.join(root, ".repo"))
+    os.makedirs(os.path.join(root, "poky", "build"))
+    cwd = os.path.join(root, *(f"level{depth}" for depth in range(48)))
+    os.makedirs(cwd)
+    return cwd, {"build": "poky/build"}, "build", ".repo"
+
+
+def make_wide(root, scale):
+    """A workspace in which the root and another ancestor have 50k entries."""
+    os.makedirs(os.path.join(root, ".repo"))
+    os.makedirs(os.path.join(root, "poky", "build"))
+    crowded = os.path.join(root, "out", "target")
+    cwd = os.path.join(crowded, "product", "generic", "obj")
+    os.makedirs(cwd)
+    touch_many(root, int(50000 * scale))
+    touch_many(crowded, int(50000 * scale))
+    return cwd, {"build": "poky/build"}, "build", ".repo"
+
+
+def make_nested(root, scale):
+    """A magic workspace with two repo workspaces and optional prefixes."""
+    del scale
+    os.makedirs(os.path.join(root, ".wsmagic"))
+    for case in ("case1", "case2"):
+        os.makedirs(os.path.join(root, case, ".repo"))
+        os.makedirs(os.path.join(root, case, "poky", "build"))
+    os.makedirs(os.path.join(root, "case1", "android", "vendor"))
+    cwd = os.path.join(root, "case1", "poky", "build", "tmp", "work")
+    os.makedirs(cwd)
+    bookmarks = {"build": "{case2/}poky/build", "vendor": "{case2/}android/vendor"}
+    return cwd, bookmarks, "vendor", ".wsmagic:.repo"
+
+
+def make_large_table(root, scale):
+    """A workspace with 10k bookmarks with optional prefixes."""
+    os.makedirs(os.path.join(root, ".repo"))
+    os.makedirs(os.path.join(root, "poky", "build"))
+    cwd = os.path.join(root, "android")
+    os.makedirs(cwd)
+    bookmarks = {
+        f"bookmark{number}": f"{{case{number % 3}/}}some/path/{number}"
+        for number in range(int(10000 * scale))
+    }
+    bookmarks["build"] = "{case2/}poky/build"
+    return cwd, bookmarks, "build", ".repo"
+
+
+SCENARIOS = {
+    "deep": make_deep,
+    "wide": make_wide,
+    "nested": make_nested,
+    "large-table": make_large_table,
+}
+
+
+def measure_phases(cwd, environ, destination, repeat):
+    """Measure get_bookmarked_path, its phases and path_to in this process."""
+    magic_files = workspace_bookmark.get_magic_files(environ)
+    directory = workspace_bookmark_cache.cache_directory(environ)
+    table = workspace_bookmark_cache.bookmark_table(
+        environ["WORKSPACE_BOOKMARKS"], directory
+    )
+    roots = workspace_bookmark.find_workspace_roots(magic_files, cwd)
+    preferred = workspace_bookmark.expand_optional_prefix(
+        {destination: table[destination]}
+    )
+    resolver = workspace_bookmark.WorkspaceResolver(cwd, environ)
+    return {
+        "get_bookmarked_path": measure(
+            lambda: workspace_bookmark.get_bookmarked_path(destination, environ, cwd),
+            repeat,
+        ),
+        "WorkspaceResolver.resolve": measure(
+            lambda: resolver.resolve(destination), repeat
+        ),
+        "phase:bookmark_table": measure(
+            lambda: workspace_bookmark_cache.bookmark_table(
+                environ["WORKSPACE_BOOKMARKS"], directory
+            ),
+            repeat,
+        ),
+        "phase:find_workspace_roots": measure(
+            lambda: workspace_bookmark.find_workspace_roots(
+                magic_files, cwd, workspace_bookmark_cache.root_cache(directory)
+            ),
+            repeat,
+        ),
+        "phase:resolve": measure(
+            lambda: workspace_bookmark.resolve(table[destination], roots, magic_files),
+            repeat,
+        ),
+        "path_to": measure(
+            lambda: workspace_bookmark.path_to(
+                destination,
+                preferred,
+                magic_files[0],
+                cwd,
+                workspace_bookmark_cache.root_cache(directory),
+            ),
+            repeat,
+        ),
+    }
+
+
+def measure_g(cwd, environ, destination, repeat):
+    """Measure a g round trip in bash, without the time bash needs to start."""
+    script = (
+        'source "$1"; cd "$2"; for ((i = 0; i < $3; i++)); '
+        'do g "$4" > /dev/null; cd "$2"; done'
+    )
+    environment = dict(os.environ, WORKSPACE_BOOKMARK_SOCKET="/nonexistent", **environ)
+
+    def run(jumps):
+        start = time.perf_counter()
+        subprocess.run(
+            ["bash", "-c", script, "g", os.path.join(repository, "setup.sh")]
+            + [cwd, str(jumps), destination],
+            env=environment,
+            check=True,
+        )
+        return time.perf_counter() - start
+
+    overhead = run(0)
+    return {"us": max(run(repeat) - overhead, 0) / repeat * 1e6, "syscalls": {}}
+
+
+def environments(temporary, bookmarks, magic_files):
+    """Yield the cold and the warm environment of a scenario."""
+    for mode, cache in (("cold", ""), ("warm", os.path.join(temporary, "cache"))):
+        yield mode, {
+            "WORKSPACE_BOOKMARKS": json.dumps(bookmarks),
+            "WORKSPACE_BOOKMARK_MAGIC_FILE": magic_files,
+            "WORKSPACE_BOOKMARK_CACHE_DIR": cache,
+        }
+
+
+def run_scenario(name, scale, repeat, shell):
+    """Return the measurements of a scenario, keyed by mode and measurement."""
+    results = {}
+    with tempfile.TemporaryDirectory() as temporary:
+        cwd, bookmarks, destination, magic_files = SCENARIOS[name](
+            os.path.join(temporary, "workspace"), scale
+        )
+        cwd = os.path.realpath(cwd)
+        for mode, environ in environments(temporary, bookmarks, magic_files):
+            # Fill the caches, when enabled, before measuring.
+            workspace_bookmark.get_bookmarked_path(destination, environ, cwd)
+            measurements = measure_phases(cwd, environ, destination, repeat)
+            if shell and len(environ["WORKSPACE_BOOKMARKS"]) < MAX_ENVIRONMENT_VARIABLE:
+                measurements["g"] = measure_g(cwd, environ, destination, repeat)
+            for measurement, result in measurements.items():
+                results[f"{name}/{mode}/{measurement}"] = result
+    return results
+
+
+def report(results, baseline):
+    """Print results, next to the baseline if there is one."""
+    print(f"{'measurement':<52} {'median us':>10} {'baseline':>10}  syscalls")
+    regressions = 0
+    for key, result in results.items():
+        previous = baseline.get(key, {}).get("us")
+        comparison = f"{previous:10.1f}" if previous else f"{'-':>10}"
+        if previous and result["us"] > previous * REGRESSION:
+            comparison += " !"
+            regressions += 1
+        syscalls = " ".join(f"{k}={v}" for k, v in sorted(result["syscalls"].items()))
+        print(f"{key:<52} {result['us']:10.1f} {comparison:<12} {syscalls}")
+    if regressions:
+        print(f"{regressions} measurements are more than {REGRESSION}x slower.")
+
+
+def main():
+    """Run the selected scenarios."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS))
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="scale the size of workspaces"
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-shell", action="store_true", help="skip g in bash")
+    parser.add_argument(
+        "--baseline", default=os.path.join(repository, "bench_baseline.json")
+    )
+    parser.add_argument("--save-baseline", action="store_true")
+    arguments = parser.parse_args()
+
+    results = {}
+    for name in arguments.scenarios:
+        results.update(
+            run_scenario(
+                name, arguments.scale, arguments.repeat, not arguments.no_shell
+            )
+        )
+    baseline = workspace_bookmark_cache.read_json(arguments.baseline, {})
+    report(results, baseline)
+    if arguments.save_baseline:
+        workspace_bookmark_cache.write_json(arguments.baseline, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+"""
+Bundle workspace_bookmark into a single precompiled zipapp.
+
+The archive holds every module both as source and as bytecode compiled by the
+interpreter running this script, so it should be built with the same python3
+which later runs it. setup.sh prefers bin/workspace_bookmark.pyz when it exists
+and imports it with 'python3 -I -S' to skip site-packages, user configuration
+and runpy. The archive can still be run directly as well.
+
+Usage: scripts/build_zipapp.py [OUTPUT]
+"""
+
+import glob
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import zipapp
+
+MAIN = """import sys
+
+import workspace_bookmark
+
+sys.exit(workspace_bookmark.cli(sys.argv[1:]))
+"""
+
+
+def main():
+    """Build the zipapp and print its path."""
+    repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = os.path.join(repository, "bin", "workspace_bookmark.pyz")
+    if len(sys.argv) > 1:
+        output = sys.argv[1]
+    with tempfile.TemporaryDirectory() as staging:
+        sources = os.path.join(repository, "src", "workspace_bookmark*.py")
+        for module in glob.glob(sources):
+            source = os.path.join(staging, os.path.basename(module))
+            shutil.copy2(module, source)
+            # zipimport looks for bytecode next to the source, not in __pycache__.
+            py_compile.compile(source, cfile=source + "c", doraise=True)
+        with open(os.path.join(staging, "__main__.py"), "w", encoding="UTF-8") as f:
+            f.write(MAIN)
+        zipapp.create_archive(staging, output, interpreter="/usr/bin/env python3")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,4 @@ set -x
 
 workspace_bookmark_dir="$(pwd)"
 test_dir="$(mktemp --directory)"
-cd "${test_dir}" && python3 -m pytest --verbose "${workspace_bookmark_dir}/src/test_workspace_bookmark.py"
+cd "${test_dir}" && python3 -m pytest --verbose "${workspace_bookmark_dir}/src"
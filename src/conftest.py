@@ -32,6 +32,22 @@ def get_random_bookmark_name():
     return get_random_string(alphabet, name_length)
 
 
+@pytest.fixture(name="_cache_directory", autouse=True)
+def set_cache_directory(monkeypatch, tmp_path):
+    """Keep caches of every test separate and out of the home directory."""
+    cache_directory = tmp_path / "cache"
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_CACHE_DIR", str(cache_directory))
+    return cache_directory
+
+
+@pytest.fixture(name="_bookmark_config", autouse=True)
+def set_bookmark_config(monkeypatch, tmp_path):
+    """Keep bookmarks of the user running the tests out of them."""
+    bookmark_config = tmp_path / "bookmarks.json"
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_CONFIG", str(bookmark_config))
+    return bookmark_config
+
+
 @pytest.fixture(name="magic_filename")
 def get_magic_filename():
     """Get name used for WORKSPACE_BOOKMARK_MAGIC_FILE but don't set env."""
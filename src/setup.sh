@@ -1,28 +1,170 @@
 #!/usr/bin/env bash
 
-this_directory="$(dirname "$BASH_SOURCE[0]")"
+# Sourced by bash or zsh, in which BASH_SOURCE is not set.
+if [ -n "$ZSH_VERSION" ]
+then
+	eval 'this_directory="$(dirname "${(%):-%x}")"'
+else
+	this_directory="$(dirname "${BASH_SOURCE[0]}")"
+fi
 PATH="$PATH:$(readlink -m "$this_directory")/bin"
-g () { 
-	p="$(workspace_bookmark.py "$1")";
+_g_pyz="$(readlink -m "$this_directory")/bin/workspace_bookmark.pyz"
+
+# Run workspace_bookmark.py, or the zipapp built by scripts/build_zipapp.py which
+# starts faster, with the given arguments. The zipapp is imported from rather
+# than run, which would import runpy and with it a few more milliseconds.
+_g_resolver () {
+	if [ -f "$_g_pyz" ]
+	then
+		python3 -I -S -c 'import sys
+sys.path.insert(0, sys.argv.pop(1))
+import workspace_bookmark
+sys.exit(workspace_bookmark.cli(sys.argv[1:]))' "$_g_pyz" "$@"
+	else
+		workspace_bookmark.py "$@"
+	fi
+}
+
+# Set variables to the names of exported variables starting with prefix.
+_g_exported () {
+	if [ -n "$ZSH_VERSION" ]
+	then
+		# zsh has no compgen, see the parameters of zshmodules(1) instead.
+		# eval keeps bash from parsing what only zsh understands.
+		eval 'local name
+		variables=()
+		for name in ${(k)parameters[(I)${1}*]}
+		do
+			[[ ${parameters[$name]} == *export* ]] && variables+=("$name")
+		done'
+	else
+		variables=($(compgen -e "$1"))
+	fi
+}
+
+# Set socket to the path the resolver daemon listens on.
+# Keep in sync with socket_path in workspace_bookmark_daemon.py.
+_g_socket () {
+	if [ -n "${WORKSPACE_BOOKMARK_SOCKET+x}" ]
+	then
+		socket="$WORKSPACE_BOOKMARK_SOCKET"
+	elif [ -n "${XDG_RUNTIME_DIR+x}" ]
+	then
+		socket="$XDG_RUNTIME_DIR/workspace-bookmark.sock"
+	else
+		socket="/tmp/workspace-bookmark-$UID/daemon.sock"
+	fi
+}
+
+# Ask the resolver daemon (workspace_bookmark.py --daemon) for a path.
+# Behaves like workspace_bookmark.py or returns 255 if the daemon can't be used.
+# Requests tell the current directory and environment and the answer where to
+# go, so only a socket of the user is trusted.
+_g_daemon () {
+	local socket code out err variable
+	local -a request variables
+	_g_socket
+	[ -S "$socket" ] && [ -O "$socket" ] && command -v socat > /dev/null || return 255
+	request=("$PWD" "$1")
+	_g_exported WORKSPACE_BOOKMARK
+	# Keep in sync with FORWARDED in workspace_bookmark_daemon.py.
+	for variable in "${variables[@]}" HOME XDG_CACHE_HOME XDG_CONFIG_HOME
+	do
+		# Names are only ever those of variables, so eval is safe.
+		eval "[ -n \"\${$variable+x}\" ]" || continue
+		eval "request+=(\"\$variable=\${$variable}\")"
+	done
+	{
+		IFS= read -r -d '' code && IFS= read -r -d '' out && IFS= read -r -d '' err
+	} < <(printf '%s\0' "${request[@]}" | socat -t 5 - "UNIX-CONNECT:$socket" 2> /dev/null)
+	case "$code" in
+		0|1|2) ;;
+		*) return 255 ;;
+	esac
+	printf '%s' "$err" >&2
+	printf '%s' "$out"
+	return "$code"
+}
+
+# Resolve a destination in the shell, with the _g_fast function printed by
+# workspace_bookmark.py --emit-shell, if WORKSPACE_BOOKMARK_SHELL is set.
+# The function is generated again whenever the bookmarks change.
+# Sets _g_fast_path or returns 255 if Python has to resolve the destination.
+_g_shell () {
+	local shell=bash code
+	[ -n "$WORKSPACE_BOOKMARK_SHELL" ] && [ -n "${WORKSPACE_BOOKMARKS+x}" ] || return 255
+	if [ "$_g_shell_key" != "$WORKSPACE_BOOKMARK_MAGIC_FILE:$WORKSPACE_BOOKMARKS" ]
+	then
+		_g_shell_key="$WORKSPACE_BOOKMARK_MAGIC_FILE:$WORKSPACE_BOOKMARKS"
+		[ -n "$ZSH_VERSION" ] && shell=zsh
+		code="$(_g_resolver --emit-shell "$shell" 2> /dev/null)" && eval "$code" || _g_fast () { return 255; }
+	fi
+	_g_fast "$1"
+}
+
+# Start the resolver daemon in the background unless it is already running.
+g_daemon_start () {
+	local socket
+	_g_socket
+	[ -S "$socket" ] || (_g_resolver --daemon > /dev/null 2>&1 &)
+}
+
+g () {
+	_g_shell "$1";
 	e=$?;
+	p="$_g_fast_path";
+	if [ $e -eq 255 ]
+	then
+		p="$(_g_daemon "$1")";
+		e=$?;
+	fi
+	if [ $e -eq 255 ]
+	then
+		p="$(_g_resolver "$1")";
+		e=$?;
+	fi
 	if [ $e -eq 0 ]
-	then 
+	then
 		cd "$p" || return $?
-	else 
+		# See workspace_bookmark_prefetch, detached like g_daemon_start.
+		[ -z "$WORKSPACE_BOOKMARK_PREFETCH" ] || (_g_resolver --prefetch "$PWD" < /dev/null > /dev/null 2>&1 &)
+	else
 		echo "$p";
 	fi
 	return $e;
 }
 
+# Print the workspace and the path in it, e.g. PS1='$(g_prompt) \$ '.
+g_prompt () {
+	_g_daemon --prompt || _g_resolver --prompt
+}
+
+# Pick a bookmark with fzf and go there.
+g_pick () {
+	local line
+	line="$(_g_resolver --list | fzf --delimiter "$(printf '\t')" --nth 1)" || return $?
+	g "${line%%$(printf '\t')*}"
+}
+
 # https://askubuntu.com/questions/68175/how-to-create-script-with-auto-complete
 _g()
 {
-  possible_destinations=$(echo "$WORKSPACE_BOOKMARKS" | jq --sort-keys 'keys' | sed -E 's/\[|\]/ /g' | tr '"' ' ' | tr ',' ' ')
-
+  local cur="${COMP_WORDS[COMP_CWORD]}"
   COMPREPLY=()
-  cur="${COMP_WORDS[COMP_CWORD]}"
-  COMPREPLY=( $(compgen -W "${possible_destinations}" -- ${cur}) )
-
+  mapfile -t COMPREPLY < <(_g_resolver --complete bash "$cur" 2> /dev/null)
   return 0
 }
-complete -o nospace -F _g g
+
+_g_zsh()
+{
+  local -a candidates
+  candidates=("${(@f)$(_g_resolver --complete zsh "$PREFIX" 2> /dev/null)}")
+  _describe 'bookmark' candidates -S ''
+}
+
+if [ -n "$ZSH_VERSION" ]
+then
+  compdef _g_zsh g
+else
+  complete -o nospace -F _g g
+fi
@@ -101,11 +101,13 @@ EOF
 
 @test "exit gracefully when destination is not in bookmarks" {
   dummy_destination="the moon"
-  proposed_fix="$(echo ''"${WORKSPACE_BOOKMARKS}" '{'\""$dummy_destination"\": \"\<YOUR PATH\>\"'}''' | jq -s add)"
   exit_message="$(cat <<EOF
 Warning: There is no "$dummy_destination" in WORKSPACE_BOOKMARKS.
+Bookmarks next to it:
+    build
+    poky
 Try setting it:
-export WORKSPACE_BOOKMARKS='$proposed_fix'
+    "$dummy_destination": "<YOUR PATH>"
 EOF
 )"
 
@@ -155,3 +157,34 @@ EOF
   echo "  actual dir: $actual_dir"
   [ "$expected_dir" = "$actual_dir" ]
 }
+
+@test "goto specified destination directory without python" {
+  export WORKSPACE_BOOKMARK_SHELL=1
+  g build
+  function workspace_bookmark.py () { return 1; }
+  cd "$DIR/test/android"
+  g build
+
+  expected_dir="$DIR/test/poky/build"
+  actual_dir="$(pwd)"
+  echo "expected dir: $expected_dir"
+  echo "  actual dir: $actual_dir"
+  [ "$expected_dir" = "$actual_dir" ]
+}
+
+@test "goto specified destination directory in zsh" {
+  command -v zsh > /dev/null || skip "zsh is not installed"
+  export WORKSPACE_BOOKMARK_X=1
+  cd /
+  run zsh -f -c '
+    source "$1/../setup.sh" || exit 1
+    _g_exported WORKSPACE_BOOKMARK
+    print -r -- " ${variables[*]} "
+    cd "$2/test/android" && g build && pwd' zsh "$BATS_TEST_DIRNAME" "$DIR"
+
+  echo "$output"
+  [ "$status" -eq 0 ]
+  [[ "${lines[0]}" == *" WORKSPACE_BOOKMARKS "* ]]
+  [[ "${lines[0]}" == *" WORKSPACE_BOOKMARK_X "* ]]
+  [ "${lines[1]}" = "$DIR/test/poky/build" ]
+}
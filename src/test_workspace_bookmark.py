@@ -10,6 +10,7 @@ shown in the tests below.
 """
 import json
 import os.path
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
@@ -123,11 +124,12 @@ def test_graceful_exit_if_destination_is_not_bookmarked(
     bookmarks = {"build": "poky/build"}
     os.environ["WORKSPACE_BOOKMARKS"] = json.dumps(bookmarks)
     destination = "someplace"
-    bookmarks[destination] = "<YOUR PATH>"
     exit_message = (
         f'Warning: There is no "{destination}" in WORKSPACE_BOOKMARKS.\n'
+        "Bookmarks next to it:\n"
+        "    build\n"
         "Try setting it:\n"
-        f"export WORKSPACE_BOOKMARKS='{json.dumps(bookmarks, indent=2)}'"
+        f'    "{destination}": "<YOUR PATH>"'
     )
 
     error_code = workspace_bookmark.main(destination)
@@ -247,3 +249,148 @@ def test_fallback_to_repo_workspace_if_path_not_found_in_magic_workspace(
 
     assert error_code == 0
     assert str(expected_path) == stdout
+
+
+def test_ancestors_are_listed_once_for_all_magic_files(
+    monkeypatch,
+    capsys,
+    _cwd_inside_repo_workspace,
+    magic_filename,
+    bookmarked_path,
+    bookmark,
+):
+    """Looking for a magic file and .repo walks up the directory tree only once."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_MAGIC_FILE", magic_filename)
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", json.dumps(bookmark))
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_CACHE_DIR", "")
+    listed_directories = []
+    listdir = os.listdir
+    monkeypatch.setattr(
+        workspace_bookmark.os,
+        "listdir",
+        lambda path: listed_directories.append(path) or listdir(path),
+    )
+
+    error_code = workspace_bookmark.main(list(bookmark.keys())[0])
+
+    assert error_code == 0
+    assert str(bookmarked_path) == capsys.readouterr().out.strip()
+    assert len(listed_directories) == len(set(listed_directories))
+
+
+def test_magic_files_are_tried_in_order_of_priority(
+    monkeypatch,
+    capsys,
+    _cwd_inside_repo_workspace,
+    repo_workspace,
+    magic_workspace,
+    magic_filename,
+):
+    """WORKSPACE_BOOKMARK_MAGIC_FILE lists magic files from the most important."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", json.dumps({"here": "."}))
+    roots = []
+    for magic_files in (f".repo:{magic_filename}", f"{magic_filename}:.repo"):
+        monkeypatch.setenv("WORKSPACE_BOOKMARK_MAGIC_FILE", magic_files)
+        workspace_bookmark.main("here")
+        roots.append(capsys.readouterr().out.strip())
+
+    assert roots == [str(repo_workspace), str(magic_workspace)]
+
+
+def test_compile_pattern_with_several_optional_segments():
+    """Optional segments can appear anywhere in a path and have alternatives."""
+    assert workspace_bookmark.compile_pattern("{case1|case2}/poky/{meta/}build") == (
+        ("case1", "case2", ""),
+        ("/poky/",),
+        ("meta/", ""),
+        ("build",),
+    )
+    assert workspace_bookmark.optional_prefix_variants("{a/}b/{c/}d") == (
+        "a/b/c/d",
+        "b/d",
+    )
+
+
+def test_resolve_alternatives_in_order_of_preference(monkeypatch, tmp_path):
+    """The first existing candidate wins and missing directories are pruned."""
+    (tmp_path / "case2" / "poky" / "build").mkdir(parents=True)
+    (tmp_path / "poky" / "build").mkdir(parents=True)
+    checked = []
+    isdir = os.path.isdir
+    monkeypatch.setattr(
+        workspace_bookmark.os.path,
+        "isdir",
+        lambda path: checked.append(path) or isdir(path),
+    )
+    pattern = "{case1/|case2/}{x/}{y/}{z/}poky/build"
+
+    resolved = workspace_bookmark.resolve(pattern, {".repo": str(tmp_path)}, [".repo"])
+
+    assert resolved == str(tmp_path / "case2" / "poky" / "build")
+    # case1 and the missing x, y and z below case2 are each checked once.
+    assert checked[:4] == [
+        str(tmp_path / "case1"),
+        str(tmp_path / "case2"),
+        str(tmp_path / "case2" / "x"),
+        str(tmp_path / "case2" / "y"),
+    ]
+    assert len(checked) < 2**4
+
+
+@pytest.mark.parametrize("pattern", ["{a|b}/x", "{a|}/x", "{case1|case2}/x"])
+def test_resolve_stays_below_root_without_optional_segments(tmp_path, pattern):
+    """Leaving out optional segments before a '/' keeps the path below the root."""
+    (tmp_path / "x").mkdir()
+
+    resolved = workspace_bookmark.resolve(pattern, {".repo": str(tmp_path)}, [".repo"])
+
+    assert resolved == str(tmp_path / "x")
+
+
+def test_resolve_prefers_optional_segments_with_alternatives(tmp_path):
+    """An existing alternative of an optional segment comes before leaving it out."""
+    (tmp_path / "x").mkdir()
+    (tmp_path / "b" / "x").mkdir(parents=True)
+
+    resolved = workspace_bookmark.resolve(
+        "{a|b}/x", {".repo": str(tmp_path)}, [".repo"]
+    )
+
+    assert resolved == str(tmp_path / "b" / "x")
+
+
+def test_resolver_reports_problems_through_exceptions(
+    capsys, repo_workspace, build_directory, tmp_path
+):
+    """A resolver uses the bookmarks it is given and prints nothing."""
+    resolver = workspace_bookmark.WorkspaceResolver(
+        str(build_directory), {}, {"build": "poky/build"}, [".repo"]
+    )
+
+    assert resolver.resolve("build/tmp") == f"{build_directory}/tmp"
+    assert resolver.resolve() == str(repo_workspace)
+    with pytest.raises(workspace_bookmark.BookmarkNotFoundError) as error:
+        resolver.resolve("android")
+    assert str(error.value).startswith('Warning: There is no "android" in')
+    with pytest.raises(workspace_bookmark.WorkspaceRootNotFoundError) as error:
+        workspace_bookmark.WorkspaceResolver(str(tmp_path), {}, {}).resolve("build")
+    assert str(error.value) == workspace_bookmark.NO_WORKSPACE_WARNING
+    assert capsys.readouterr().err == ""
+
+
+def test_resolver_finds_roots_once_for_all_threads(monkeypatch, build_directory):
+    """Concurrent resolutions share the workspace roots found by the first one."""
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(
+        "os.listdir", lambda path: listings.append(path) or listdir(path)
+    )
+    resolver = workspace_bookmark.WorkspaceResolver(
+        str(build_directory), {}, '{"build": "poky/build"}'
+    )
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = list(pool.map(resolver.resolve, ["build"] * 1000))
+
+    assert paths == [str(build_directory)] * 1000
+    assert len(listings) == len(set(listings))
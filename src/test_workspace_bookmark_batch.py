@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Test resolving many destinations in a single run."""
+import io
+import json
+
+import workspace_bookmark
+import workspace_bookmark_batch
+
+
+def test_batch_from_arguments(
+    monkeypatch, capsys, _cwd_inside_repo_workspace, build_directory
+):
+    """Every destination gets a line with its status and path."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "poky/build"}')
+
+    assert workspace_bookmark_batch.main(["build", "build/tmp", "the moon"]) == 2
+    output = capsys.readouterr()
+    assert output.out == (f"0\t{build_directory}\n0\t{build_directory}/tmp\n2\t\n")
+    assert output.err.startswith('Warning: There is no "the moon"')
+
+
+def test_batch_from_stdin_as_json(
+    monkeypatch, capsys, _cwd_inside_repo_workspace, build_directory
+):
+    """Destinations are read from stdin, NUL terminated with --null."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "poky/build"}')
+    monkeypatch.setattr("sys.stdin", io.StringIO("build\0build/a b\0"))
+
+    assert workspace_bookmark.cli(["--batch", "--null"]) == 0
+    assert capsys.readouterr().out == (
+        f"0\t{build_directory}\0" f"0\t{build_directory}/a b\0"
+    )
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("build\nnothing\n"))
+    assert workspace_bookmark.cli(["--batch", "--json"]) == 2
+    results = json.loads(capsys.readouterr().out)
+    assert [result["status"] for result in results] == [0, 2]
+    assert results[0]["path"] == str(build_directory)
+    assert results[1]["warning"].startswith('Warning: There is no "nothing"')
+
+
+def test_batch_outside_workspace(monkeypatch, capsys, _cwd_outside_any_workspace):
+    """Without a workspace every destination fails with status 1."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "poky/build"}')
+    listings = []
+    monkeypatch.setattr("os.listdir", lambda path: listings.append(path) or [])
+
+    assert workspace_bookmark_batch.main(["build", "build"]) == 1
+    assert capsys.readouterr().out == "1\t\n1\t\n"
+    assert len(listings) == len(set(listings))
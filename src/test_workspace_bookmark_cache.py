@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Test the persistent caches used to speed up workspace_bookmark."""
+import json
+import os
+
+import workspace_bookmark
+import workspace_bookmark_cache
+
+
+def count_listdir_calls(monkeypatch):
+    """Make os.listdir count its calls, return the list the calls are put in."""
+    calls = []
+    listdir = os.listdir
+
+    def counting_listdir(path):
+        calls.append(path)
+        return listdir(path)
+
+    monkeypatch.setattr(workspace_bookmark.os, "listdir", counting_listdir)
+    return calls
+
+
+def test_workspace_root_is_found_without_listing_directories_again(
+    monkeypatch, repo_workspace, _cwd_inside_repo_workspace, _cache_directory
+):
+    """The second lookup from the same directory is answered from the cache."""
+    cache = workspace_bookmark_cache.RootCache(str(_cache_directory / "roots.json"))
+    listdir_calls = count_listdir_calls(monkeypatch)
+
+    first_root = workspace_bookmark.find_workspace_root(".repo", os.getcwd(), cache)
+    first_listdir_calls = len(listdir_calls)
+    reloaded_cache = workspace_bookmark_cache.RootCache(cache.path)
+    second_root = workspace_bookmark.find_workspace_root(
+        ".repo", os.getcwd() + "/below", reloaded_cache
+    )
+
+    assert first_root == second_root == str(repo_workspace)
+    assert first_listdir_calls > 0
+    assert len(listdir_calls) == first_listdir_calls
+
+
+def test_stale_workspace_root_is_evicted(
+    monkeypatch, repo_workspace, _cwd_inside_repo_workspace, _cache_directory
+):
+    """A root without the magic file is dropped and looked up again."""
+    cache = workspace_bookmark_cache.RootCache(str(_cache_directory / "roots.json"))
+    workspace_bookmark.find_workspace_root(".repo", os.getcwd(), cache)
+    os.rmdir(repo_workspace / ".repo")
+    os.mkdir(os.path.join(os.getcwd(), ".repo"))
+    listdir_calls = count_listdir_calls(monkeypatch)
+
+    root = workspace_bookmark.find_workspace_root(".repo", os.getcwd(), cache)
+
+    assert root == os.getcwd()
+    assert len(listdir_calls) == 1
+    assert str(repo_workspace) not in cache.roots[".repo"].values()
+
+
+def test_nested_workspace_below_cached_directory_is_found(tmp_path, _cache_directory):
+    """A workspace inside a cached one is not mistaken for the outer one."""
+    (tmp_path / "ws" / ".repo").mkdir(parents=True)
+    (tmp_path / "ws" / "a").mkdir()
+    (tmp_path / "ws" / "inner" / ".repo").mkdir(parents=True)
+    (tmp_path / "ws" / "inner" / "sub").mkdir()
+    cache = workspace_bookmark_cache.RootCache(str(_cache_directory / "roots.json"))
+
+    outer = workspace_bookmark.find_workspace_root(
+        ".repo", str(tmp_path / "ws" / "a"), cache
+    )
+    inner = workspace_bookmark.find_workspace_root(
+        ".repo", str(tmp_path / "ws" / "inner" / "sub"), cache
+    )
+
+    assert outer == str(tmp_path / "ws")
+    assert inner == str(tmp_path / "ws" / "inner")
+
+
+def test_root_cache_is_bounded(monkeypatch, tmp_path):
+    """Oldest directories are forgotten once the cache is full."""
+    monkeypatch.setattr(workspace_bookmark_cache, "MAX_ROOT_CACHE_ENTRIES", 3)
+    cache = workspace_bookmark_cache.RootCache(str(tmp_path / "roots.json"))
+
+    cache.store(".repo", ["/a/b", "/a"], "/a")
+    cache.store(".wsmagic", ["/c/d", "/c"], "/c")
+
+    assert cache.roots == {
+        ".repo": {"/a": "/a"},
+        ".wsmagic": {"/c/d": "/c", "/c": "/c"},
+    }
+
+
+def test_large_bookmark_table_is_looked_up_in_an_index(monkeypatch, tmp_path):
+    """The second time a large table is used it is not parsed again."""
+    monkeypatch.setattr(workspace_bookmark_cache, "BOOKMARK_INDEX_THRESHOLD", 0)
+    bookmarks = {f"bookmark{number}": f"{{case/}}path/{number}" for number in range(99)}
+    serialized = json.dumps(bookmarks)
+
+    parsed = workspace_bookmark_cache.bookmark_table(serialized, str(tmp_path))
+    workspace_bookmark_cache.bookmark_table.cache_clear()
+    index = workspace_bookmark_cache.bookmark_table(serialized, str(tmp_path))
+
+    assert parsed == bookmarks
+    assert isinstance(index, workspace_bookmark_cache.BookmarkIndex)
+    assert dict(index) == bookmarks
+    assert all(index[name] == path for name, path in bookmarks.items())
+    assert "bookmark" not in index
+
+
+def test_jump_with_bookmark_index(
+    monkeypatch, capsys, _cwd_inside_repo_workspace, build_directory
+):
+    """A jump gives the same result whether the table comes from an index or not."""
+    monkeypatch.setattr(workspace_bookmark_cache, "BOOKMARK_INDEX_THRESHOLD", 0)
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", json.dumps({"build": "poky/build"}))
+    paths = []
+    for _ in range(2):
+        workspace_bookmark_cache.bookmark_table.cache_clear()
+        workspace_bookmark.main("build")
+        paths.append(capsys.readouterr().out.strip())
+
+    assert paths == [str(build_directory)] * 2
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Test completion of bookmarks and of paths below them."""
+import os
+
+import workspace_bookmark_complete
+
+
+def test_complete_bookmark_names(monkeypatch, _cwd_inside_repo_workspace):
+    """Bookmarks starting with the word are completed."""
+    monkeypatch.setenv(
+        "WORKSPACE_BOOKMARKS", '{"build": "poky/build", "android": "android"}'
+    )
+
+    assert workspace_bookmark_complete.complete("b") == ["build"]
+    assert workspace_bookmark_complete.complete("") == ["android", "build"]
+
+
+def test_complete_directories_below_bookmark(
+    monkeypatch, _cwd_inside_repo_workspace, build_directory
+):
+    """After a '/' directories below the bookmarked path are completed."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"poky": "poky"}')
+    (build_directory / "tmp" / "work").mkdir(parents=True)
+    (build_directory / "tmp" / "workdir").mkdir()
+    (build_directory / "tmp" / "worklog").touch()
+
+    assert workspace_bookmark_complete.complete("poky/") == ["poky/build/"]
+    assert workspace_bookmark_complete.complete("poky/build/tmp/wo") == [
+        "poky/build/tmp/work/",
+        "poky/build/tmp/workdir/",
+    ]
+    assert workspace_bookmark_complete.complete("nothing/") == []
+
+
+def test_directory_listing_is_cached(monkeypatch, tmp_path, _cache_directory):
+    """A directory is scanned once as long as it doesn't change."""
+    scans = []
+    scan_directories = workspace_bookmark_complete.scan_directories
+    monkeypatch.setattr(
+        workspace_bookmark_complete,
+        "scan_directories",
+        lambda path: scans.append(path) or scan_directories(path),
+    )
+    tree = tmp_path / "tree"
+    (tree / "one").mkdir(parents=True)
+
+    first = workspace_bookmark_complete.list_directories(
+        str(tree), str(_cache_directory)
+    )
+    second = workspace_bookmark_complete.list_directories(
+        str(tree), str(_cache_directory)
+    )
+    (tree / "two").mkdir()
+    os.utime(tree, ns=(0, 0))
+    third = workspace_bookmark_complete.list_directories(
+        str(tree), str(_cache_directory)
+    )
+
+    assert first == second == ["one"]
+    assert third == ["one", "two"]
+    assert len(scans) == 2
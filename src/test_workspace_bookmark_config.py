@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Test bookmarks defined in files of the user and of workspaces."""
+import json
+import os
+
+import workspace_bookmark
+import workspace_bookmark_cache
+import workspace_bookmark_config
+
+
+def test_files_are_merged_with_the_environment(
+    monkeypatch, capsys, repo_workspace, _bookmark_config, _cwd_inside_repo_workspace
+):
+    """Workspace files override the user file, WORKSPACE_BOOKMARKS overrides both."""
+    _bookmark_config.write_text(
+        json.dumps({"build": "nothing", "android": "android", "poky": "nothing"})
+    )
+    (repo_workspace / ".workspace-bookmarks.json").write_text(
+        json.dumps({"build": "poky/build", "poky": "nothing either"})
+    )
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"poky": "poky"}')
+
+    for destination, path in (
+        ("build", "poky/build"),
+        ("android", "android"),
+        ("poky", "poky"),
+    ):
+        assert workspace_bookmark.main(destination) == 0
+        assert capsys.readouterr().out == f"{repo_workspace}/{path}\n"
+
+    monkeypatch.delenv("WORKSPACE_BOOKMARKS")
+    assert workspace_bookmark.main("build") == 0
+    assert capsys.readouterr().err == ""
+
+
+def test_merged_table_is_cached_until_a_file_changes(
+    monkeypatch, repo_workspace, _bookmark_config
+):
+    """Files are parsed again only once their modification time changes."""
+    # hashlib takes a few ms to import, too long for every jump.
+    monkeypatch.setattr(workspace_bookmark_cache, "digest", None)
+    reads = []
+    read_bookmarks = workspace_bookmark_config.read_bookmarks
+    monkeypatch.setattr(
+        workspace_bookmark_config,
+        "read_bookmarks",
+        lambda path: reads.append(path) or read_bookmarks(path),
+    )
+    _bookmark_config.write_text('{"build": "poky/build"}')
+    roots = {".repo": str(repo_workspace)}
+    environ = dict(os.environ)
+    environ.pop("WORKSPACE_BOOKMARKS", None)
+
+    def merged():
+        workspace_bookmark_config.merge_bookmarks.cache_clear()
+        return json.loads(
+            workspace_bookmark.bookmark_sources(environ, roots, [".repo"])
+        )
+
+    assert merged() == {"build": "poky/build"}
+    assert merged() == {"build": "poky/build"}
+    assert reads == [str(_bookmark_config)]
+
+    _bookmark_config.write_text('{"build": "build"}')
+    os.utime(_bookmark_config, ns=(0, 0))
+    assert merged() == {"build": "build"}
+    assert len(reads) == 2
+    environ["WORKSPACE_BOOKMARKS"] = '{"poky": "poky"}'
+    assert merged() == {"build": "build", "poky": "poky"}
+
+
+def test_bad_file_is_skipped(capsys, repo_workspace, _bookmark_config):
+    """A file which can't be parsed is reported and the rest is used."""
+    _bookmark_config.write_text('["build"]')
+    (repo_workspace / ".workspace-bookmarks.json").write_text('{"build": "poky"}')
+    warnings = []
+
+    bookmarks = workspace_bookmark.bookmark_sources(
+        {"WORKSPACE_BOOKMARK_CONFIG": str(_bookmark_config)},
+        {".repo": str(repo_workspace)},
+        [".repo"],
+        warnings,
+    )
+
+    assert json.loads(bookmarks) == {"build": "poky"}
+    assert warnings == [
+        f"Warning: Can't read bookmarks from {_bookmark_config}: "
+        "it is not an object of names and paths\n"
+    ]
+    assert capsys.readouterr().err == ""
+
+
+def test_bad_file_is_warned_about_by_g_only(
+    capsys, repo_workspace, _bookmark_config, _cwd_inside_repo_workspace
+):
+    """A resolver reports a bad file through bookmark_warnings, g prints it."""
+    (repo_workspace / ".workspace-bookmarks.json").write_text("{")
+    resolver = workspace_bookmark.WorkspaceResolver(os.getcwd())
+
+    assert resolver.resolve("") == str(repo_workspace)
+    assert resolver.bookmark_warnings()[0].startswith(
+        f"Warning: Can't read bookmarks from {repo_workspace}/.workspace-bookmarks"
+    )
+    assert capsys.readouterr().err == ""
+    assert workspace_bookmark.main("") == 0
+    assert capsys.readouterr().err == resolver.bookmark_warnings()[0]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Test that the resolver daemon answers exactly like a one-shot run would."""
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import workspace_bookmark
+import workspace_bookmark_daemon
+
+
+@pytest.fixture(name="daemon_socket")
+def run_daemon(tmp_path, monkeypatch):
+    """Serve requests in a background thread, return the socket path."""
+    path = str(tmp_path / "daemon.sock")
+    server = threading.Thread(
+        target=workspace_bookmark_daemon.serve, args=(path,), daemon=True
+    )
+    # serve installs a SIGTERM handler which is only allowed in the main thread.
+    monkeypatch.setattr(workspace_bookmark_daemon.signal, "signal", lambda *_: None)
+    server.start()
+    while not workspace_bookmark_daemon.is_listening(path):
+        pass
+    return path
+
+
+@pytest.mark.parametrize(
+    "destination,bookmarks",
+    [
+        ("build", {"build": "poky/build"}),
+        ("poky/build", {"poky": "poky"}),
+        ("", {}),
+        ("someplace", {"build": "poky/build"}),
+    ],
+)
+def test_daemon_answers_like_main(
+    capsys, daemon_socket, _cwd_inside_repo_workspace, destination, bookmarks
+):
+    """Exit code, stdout and stderr have to be the same with and without daemon."""
+    environ = {
+        "WORKSPACE_BOOKMARKS": json.dumps(bookmarks),
+        "WORKSPACE_BOOKMARK_CACHE_DIR": os.environ["WORKSPACE_BOOKMARK_CACHE_DIR"],
+    }
+    expected_exit_code = workspace_bookmark.main(destination, environ)
+    expected = capsys.readouterr()
+
+    answer = workspace_bookmark_daemon.query(
+        daemon_socket, destination, environ, os.getcwd()
+    )
+
+    assert answer == (expected_exit_code, expected.out, expected.err)
+
+
+def test_daemon_reads_files_of_caller(
+    capsys, tmp_path, daemon_socket, _cwd_inside_repo_workspace
+):
+    """Bookmark files and caches are found where the caller's ones are."""
+    config = tmp_path / "config" / "workspace-bookmark" / "bookmarks.json"
+    config.parent.mkdir(parents=True)
+    config.write_text(json.dumps({"build": "poky/build"}))
+    environ = {
+        "XDG_CONFIG_HOME": str(tmp_path / "config"),
+        "XDG_CACHE_HOME": str(tmp_path / "xdg-cache"),
+    }
+    assert workspace_bookmark.main("build", environ) == 0
+    expected = capsys.readouterr()
+
+    answer = workspace_bookmark_daemon.query(
+        daemon_socket, "build", environ, os.getcwd()
+    )
+
+    assert answer == (0, expected.out, expected.err)
+    assert (tmp_path / "xdg-cache" / "workspace-bookmark").is_dir()
+
+
+def test_daemon_reports_missing_workspace(daemon_socket, _cwd_outside_any_workspace):
+    """Exit with 1 when the caller is not inside of a workspace."""
+    exit_code, stdout, stderr = workspace_bookmark_daemon.query(
+        daemon_socket, "", {"WORKSPACE_BOOKMARKS": "{}"}, os.getcwd()
+    )
+
+    assert exit_code == 1
+    assert stdout == ""
+    assert stderr.startswith("Warning: There is no .repo directory")
+
+
+def test_daemon_answers_prompt(capsys, daemon_socket, _cwd_inside_repo_workspace):
+    """The prompt segment is the same with and without daemon."""
+    environ = {
+        "WORKSPACE_BOOKMARK_CACHE_DIR": os.environ["WORKSPACE_BOOKMARK_CACHE_DIR"]
+    }
+    workspace_bookmark.cli(["--prompt"])
+
+    answer = workspace_bookmark_daemon.query(
+        daemon_socket, "--prompt", environ, os.getcwd()
+    )
+
+    assert answer == (0, capsys.readouterr().out, "")
+
+
+def test_daemon_doesnt_replace_other_files(capsys, tmp_path):
+    """Only a socket of the user is replaced by a new daemon."""
+    path = tmp_path / "daemon.sock"
+    path.write_text("")
+
+    assert workspace_bookmark_daemon.serve(str(path)) == 1
+    assert capsys.readouterr().err == f"Warning: {path} is not a socket of yours.\n"
+    assert path.exists()
+
+
+def test_query_refuses_socket_writable_by_others(daemon_socket):
+    """Requests tell where the user is, they aren't sent to a socket of others."""
+    os.chmod(daemon_socket, 0o777)
+
+    with pytest.raises(PermissionError):
+        workspace_bookmark_daemon.query(daemon_socket, "", {}, os.getcwd())
+
+
+def test_default_socket_directory_must_be_private(monkeypatch, tmp_path):
+    """A directory another user could have made is not listened in."""
+    directory = tmp_path / "workspace-bookmark"
+    path = str(directory / "daemon.sock")
+    monkeypatch.setattr(workspace_bookmark_daemon, "socket_path", lambda _: path)
+
+    assert workspace_bookmark_daemon.prepare_directory(path) is None
+    assert directory.stat().st_mode & 0o777 == 0o700
+    directory.chmod(0o777)
+    assert workspace_bookmark_daemon.prepare_directory(path) == (
+        f"Warning: {directory} is not a private directory of yours."
+    )
+
+
+def test_daemon_traces_startup_of_request(
+    tmp_path, daemon_socket, _cwd_inside_repo_workspace
+):
+    """The startup of a jump answered by the daemon is timed from its request."""
+    trace = tmp_path / "trace.jsonl"
+    environ = {"WORKSPACE_BOOKMARKS": "{}", "WORKSPACE_BOOKMARK_TRACE": str(trace)}
+    before = time.process_time()
+
+    workspace_bookmark_daemon.query(daemon_socket, "", environ, os.getcwd())
+
+    record = json.loads(trace.read_text())
+    assert 0 <= record["startup_ms"] <= (time.process_time() - before) * 1000
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Test the check of every bookmark in every workspace."""
+import workspace_bookmark
+
+
+def test_doctor_prints_matrix_of_tiers(monkeypatch, capsys, tmp_path):
+    """Each cell tells the tier a bookmark resolves to or that it is broken."""
+    for workspace in ("android", "yocto"):
+        (tmp_path / workspace / ".repo").mkdir(parents=True)
+    (tmp_path / "android" / "out" / "build").mkdir(parents=True)
+    (tmp_path / "yocto" / "build").mkdir(parents=True)
+    (tmp_path / "yocto" / "poky").mkdir()
+    (tmp_path / "yocto" / ".workspace-bookmarks.json").write_text('{"poky": "poky"}')
+    monkeypatch.setenv(
+        "WORKSPACE_BOOKMARKS", '{"build": "{out/}build", "gone": "nowhere"}'
+    )
+
+    assert workspace_bookmark.cli(["--doctor", str(tmp_path)]) == 2
+    output = capsys.readouterr()
+    assert output.out.splitlines() == [
+        "bookmark\tandroid\tyocto",
+        "build\t0\t1",
+        "gone\t-\t-",
+        "poky\t.\t0",
+    ]
+    assert output.err == "Warning: Broken in every workspace: gone\n"
+
+
+def test_doctor_checks_below_workspace_without_optional_segments(
+    monkeypatch, capsys, tmp_path
+):
+    """Candidates leaving out a leading optional segment stay in the workspace."""
+    (tmp_path / "yocto" / ".repo").mkdir(parents=True)
+    (tmp_path / "yocto" / "poky" / "build").mkdir(parents=True)
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "{case1|case2}/poky/build"}')
+
+    assert workspace_bookmark.cli(["--doctor", str(tmp_path)]) == 0
+    assert capsys.readouterr().out.splitlines() == ["bookmark\tyocto", "build\t2"]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Test running a command in a bookmarked directory of every workspace."""
+import pytest
+
+import workspace_bookmark
+
+
+def test_each_runs_in_every_workspace(monkeypatch, capsys, tmp_path):
+    """Output is prefixed by workspace and the exit code is the highest status."""
+    for workspace in ("android", "yocto", "empty"):
+        (tmp_path / workspace / ".repo").mkdir(parents=True)
+    (tmp_path / "android" / "out" / "build").mkdir(parents=True)
+    (tmp_path / "yocto" / "build" / "ok").mkdir(parents=True)
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "{out/}build"}')
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_SCAN_THREADS", "1")
+
+    status = workspace_bookmark.cli(
+        ["--each", "--under", str(tmp_path), "build", "--"]
+        + ["sh", "-c", 'echo "$PWD"; test -d ok || exit 3']
+    )
+
+    output = capsys.readouterr()
+    assert status == 3
+    assert output.out.splitlines() == [
+        f"android: {tmp_path}/android/out/build",
+        f"yocto: {tmp_path}/yocto/build",
+    ]
+    assert output.err.splitlines() == [
+        f"empty: Warning: {tmp_path}/empty/build doesn't exist.",
+        "Warning: Failed in android (3), empty (2)",
+    ]
+
+
+def test_each_needs_a_command(capsys, tmp_path):
+    """Without a command after -- nothing is run."""
+    with pytest.raises(SystemExit):
+        workspace_bookmark.cli(["--each", "--under", str(tmp_path), "build"])
+    assert "a command is needed" in capsys.readouterr().err
+
+
+def test_each_skips_workspaces_without_bookmark(monkeypatch, capsys, tmp_path):
+    """A bookmark is never abbreviated, it runs only where it is defined."""
+    (tmp_path / "android" / ".repo").mkdir(parents=True)
+    (tmp_path / "android" / "vendor-tools").mkdir()
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"vendor-tools": "vendor-tools"}')
+
+    status = workspace_bookmark.cli(
+        ["--each", "--under", str(tmp_path), "vendor", "--", "pwd"]
+    )
+
+    output = capsys.readouterr()
+    assert status == 2
+    assert not output.out
+    assert output.err.startswith('android: Warning: There is no "vendor" in')
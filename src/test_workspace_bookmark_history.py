@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Test the history of jumps."""
+import os
+
+import workspace_bookmark
+import workspace_bookmark_history
+
+
+def test_jump_back_through_history(
+    monkeypatch, capsys, repo_workspace, _cwd_inside_repo_workspace
+):
+    """g - goes to the jump before the last one and g @N to the Nth last one."""
+    monkeypatch.setenv(
+        "WORKSPACE_BOOKMARKS", '{"build": "poky/build", "android": "android"}'
+    )
+    for destination in ("build", "android", "android", "build/tmp"):
+        workspace_bookmark.main(destination)
+    capsys.readouterr()
+
+    assert workspace_bookmark.main("-") == 0
+    assert capsys.readouterr().out == f"{repo_workspace}/android\n"
+    # The jump back is remembered like any other, so g - toggles.
+    assert workspace_bookmark.main("-") == 0
+    assert capsys.readouterr().out == f"{repo_workspace}/poky/build/tmp\n"
+    assert workspace_bookmark.main("@4") == 0
+    assert capsys.readouterr().out == f"{repo_workspace}/poky/build\n"
+
+    assert workspace_bookmark.cli(["--history"]) == 0
+    listing = [line.split("\t") for line in capsys.readouterr().out.splitlines()]
+    assert [(number, destination) for number, _, destination in listing] == [
+        ("@0", "build"),
+        ("@1", "build/tmp"),
+        ("@2", "android"),
+        ("@3", "build/tmp"),
+        ("@4", "android"),
+        ("@5", "build"),
+    ]
+
+    assert workspace_bookmark.main("@6") == 2
+    assert capsys.readouterr().err == (
+        "Warning: There is no @6 in the history of this workspace.\n"
+    )
+
+
+def test_history_is_a_fixed_size_ring(_cwd_inside_repo_workspace):
+    """Old jumps are overwritten and the file never grows."""
+    environ = dict(os.environ)
+    roots = workspace_bookmark.WorkspaceResolver(os.getcwd(), environ).roots()
+    slots = workspace_bookmark_history.HISTORY_SLOTS
+    for number in range(slots + 10):
+        workspace_bookmark_history.remember(f"bookmark{number}", environ, roots)
+
+    path = workspace_bookmark_history.history_path(environ, roots)
+    jumps = workspace_bookmark_history.read_history(path)
+    assert os.path.getsize(path) == workspace_bookmark_history.HISTORY_SIZE
+    assert len(jumps) == slots
+    assert jumps[0][1] == f"bookmark{slots + 9}"
+    assert jumps[-1][1] == "bookmark10"
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Test jumps through the directory index of a workspace."""
+import os
+import time
+
+import pytest
+
+import workspace_bookmark
+import workspace_bookmark_index
+
+
+def test_jump_to_directory_by_name(
+    monkeypatch, capsys, repo_workspace, build_directory, _cwd_inside_repo_workspace
+):
+    """'**' matches any directories, the shallowest match wins."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_INDEX", "1")
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "poky/build"}')
+    (build_directory / "tmp" / "recipes-core").mkdir(parents=True)
+    (build_directory / "meta" / "a" / "recipes-core").mkdir(parents=True)
+    (build_directory / "meta" / "b" / "deep-c" / "recipes-core").mkdir(parents=True)
+
+    assert workspace_bookmark.main("build/**/recipes-core") == 0
+    assert capsys.readouterr().out == f"{build_directory}/meta/a/recipes-core\n"
+    assert workspace_bookmark.main("**/deep-c") == 0
+    assert capsys.readouterr().out == f"{build_directory}/meta/b/deep-c\n"
+    assert workspace_bookmark.main("build/meta/*/**/recipes-?ore") == 0
+    assert capsys.readouterr().out == f"{build_directory}/meta/a/recipes-core\n"
+
+    # A directory made since the index was updated is found as well.
+    (repo_workspace / "vendor" / "vendor-name").mkdir(parents=True)
+    assert workspace_bookmark.main("**/vendor-name") == 0
+    assert capsys.readouterr().out == f"{repo_workspace}/vendor/vendor-name\n"
+
+    assert workspace_bookmark.main("build/**/nothing") == 2
+    assert capsys.readouterr().err == (
+        f"Warning: There is no **/nothing below {build_directory}.\n"
+    )
+
+
+def test_update_lists_only_changed_directories(
+    monkeypatch, repo_workspace, _cache_directory
+):
+    """Directories whose mtime didn't change are taken from the index."""
+    listed = []
+    list_subdirectories = workspace_bookmark_index.list_subdirectories
+    monkeypatch.setattr(
+        workspace_bookmark_index,
+        "list_subdirectories",
+        lambda root, directory, skip: listed.append(directory)
+        or list_subdirectories(root, directory, skip),
+    )
+    (repo_workspace / "a" / "b").mkdir(parents=True)
+    (repo_workspace / "c").mkdir()
+    (repo_workspace / "out" / "huge").mkdir(parents=True)
+    root, cache = str(repo_workspace), str(_cache_directory)
+
+    count = workspace_bookmark_index.update(root, os.environ, cache)
+    assert "out" not in listed and "out/huge" not in listed
+    listed.clear()
+    (repo_workspace / "a" / "d").mkdir()
+
+    assert workspace_bookmark_index.update(root, os.environ, cache) == count + 1
+    assert listed == ["a", "a/d"]
+
+
+def test_miss_updates_only_stale_index(
+    monkeypatch, repo_workspace, build_directory, _cache_directory
+):
+    """A search finding nothing updates the index only if it may be outdated."""
+    updates = []
+    update = workspace_bookmark_index.update
+    monkeypatch.setattr(
+        workspace_bookmark_index,
+        "update",
+        lambda root, environ, cache: updates.append(root)
+        or update(root, environ, cache),
+    )
+    (build_directory / "meta" / "a").mkdir(parents=True)
+    (repo_workspace / "poky" / "build-x" / "recipes-core").mkdir(parents=True)
+    root, cache = str(repo_workspace), str(_cache_directory)
+    roots = {".repo": root}
+
+    def find(pattern):
+        return workspace_bookmark_index.find(
+            str(build_directory), pattern, os.environ, roots
+        )
+
+    assert find("**/a") == f"{build_directory}/meta/a"
+    assert len(updates) == 1
+    with pytest.raises(workspace_bookmark.BookmarkNotFoundError):
+        find("**/recipes-core")
+    assert len(updates) == 1
+
+    # Directories named before the first wildcard are checked for changes.
+    (build_directory / "meta" / "b").mkdir()
+    assert find("meta/**/b") == f"{build_directory}/meta/b"
+    assert len(updates) == 2
+    # Others only once the index is old.
+    (build_directory / "meta" / "a" / "c").mkdir()
+    with pytest.raises(workspace_bookmark.BookmarkNotFoundError):
+        find("**/c")
+    old = time.time() - workspace_bookmark_index.INDEX_MAX_AGE - 1
+    os.utime(workspace_bookmark_index.index_path(root, cache), (old, old))
+    assert find("**/c") == f"{build_directory}/meta/a/c"
+    assert len(updates) == 3
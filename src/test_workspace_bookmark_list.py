@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Test the listing of bookmarks for pickers."""
+import workspace_bookmark
+
+
+def test_list_bookmarks_with_paths(
+    monkeypatch, capsys, repo_workspace, build_directory, _cwd_inside_repo_workspace
+):
+    """Every bookmark is listed with the path g goes to and whether it exists."""
+    monkeypatch.setenv(
+        "WORKSPACE_BOOKMARKS",
+        '{"build": "{nothing/}poky/build", "gone": "nowhere", "a:b": "android"}',
+    )
+
+    assert workspace_bookmark.cli(["--list"]) == 0
+    assert sorted(capsys.readouterr().out.splitlines()) == [
+        f"a:b\t{repo_workspace}/android\texists",
+        f"build\t{build_directory}\texists",
+        f"gone\t{repo_workspace}/nowhere\tmissing",
+    ]
+
+
+def test_list_outside_workspace(capsys, _cwd_outside_any_workspace):
+    """Without a workspace nothing is listed."""
+    assert workspace_bookmark.cli(["--list"]) == 1
+    assert capsys.readouterr().out == ""
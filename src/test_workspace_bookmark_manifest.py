@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Test bookmarks generated from the repo manifest."""
+import os
+
+import pytest
+
+import workspace_bookmark
+import workspace_bookmark_manifest
+
+
+@pytest.fixture(name="manifest")
+def write_manifest(repo_workspace):
+    """Write a manifest with an include and a local manifest, return its path."""
+    manifests = repo_workspace / ".repo" / "manifests"
+    manifests.mkdir()
+    (manifests / "default.xml").write_text(
+        "<manifest>\n"
+        '  <project name="platform/frameworks/base" path="frameworks/base"/>\n'
+        '  <project name="poky"/>\n'
+        '  <include name="bsp.xml"/>\n'
+        "</manifest>\n"
+    )
+    (manifests / "bsp.xml").write_text(
+        "<manifest>\n"
+        '  <project name="yocto/linux-yocto" path="poky/kernel/linux-yocto"/>\n'
+        '  <project name="vendor/secret" path="vendor/secret"/>\n'
+        "</manifest>\n"
+    )
+    local_manifests = repo_workspace / ".repo" / "local_manifests"
+    local_manifests.mkdir()
+    (local_manifests / "local.xml").write_text(
+        '<manifest><remove-project name="vendor/secret"/></manifest>\n'
+    )
+    manifest = repo_workspace / ".repo" / "manifest.xml"
+    manifest.write_text('<manifest><include name="default.xml"/></manifest>\n')
+    return manifest
+
+
+def test_lookup_project(manifest, repo_workspace, _cache_directory):
+    """Projects are found by name, path or unique basename, with a path after."""
+    del manifest
+    root = str(repo_workspace)
+
+    def lookup(destination):
+        return workspace_bookmark_manifest.lookup_project(
+            destination, root, str(_cache_directory)
+        )
+
+    assert lookup("platform/frameworks/base") == (f"{root}/frameworks/base", "")
+    assert lookup("frameworks/base/core/java") == (
+        f"{root}/frameworks/base",
+        "/core/java",
+    )
+    assert lookup("linux-yocto") == (f"{root}/poky/kernel/linux-yocto", "")
+    assert lookup("poky/build") == (f"{root}/poky", "/build")
+    with pytest.raises(KeyError):
+        lookup("vendor/secret")
+
+
+def test_project_index_is_cached_until_manifest_changes(
+    monkeypatch, manifest, repo_workspace, _cache_directory
+):
+    """Manifests are parsed again only once one of them is modified."""
+    parses = []
+    elements = workspace_bookmark_manifest.ManifestParser.elements
+    monkeypatch.setattr(
+        workspace_bookmark_manifest.ManifestParser,
+        "elements",
+        staticmethod(lambda path: parses.append(path) or elements(path)),
+    )
+    root, cache = str(repo_workspace), str(_cache_directory)
+
+    workspace_bookmark_manifest.project_index(root, cache)
+    parsed = len(parses)
+    workspace_bookmark_manifest.project_index(root, cache)
+    assert len(parses) == parsed
+
+    bsp = manifest.parent / "manifests" / "bsp.xml"
+    bsp.write_text('<manifest><project name="meta-foo"/></manifest>\n')
+    os.utime(bsp, ns=(0, 0))
+    assert "meta-foo" in workspace_bookmark_manifest.project_index(root, cache)
+    assert len(parses) == 2 * parsed
+
+
+def test_jump_to_project(monkeypatch, manifest, _cwd_inside_repo_workspace):
+    """With WORKSPACE_BOOKMARK_MANIFEST set g jumps to projects."""
+    root = manifest.parent.parent
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"base": "poky/build"}')
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_MANIFEST", "1")
+
+    assert workspace_bookmark.get_bookmarked_path("frameworks/base") == str(
+        root / "frameworks/base"
+    )
+    assert workspace_bookmark.get_bookmarked_path("base") == str(root / "poky/build")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Test jumping to bookmarks by abbreviated or misspelled names."""
+import json
+
+import pytest
+
+import workspace_bookmark
+import workspace_bookmark_cache
+import workspace_bookmark_match
+
+BOOKMARKS = json.dumps(
+    {
+        "build": "poky/build",
+        "build-tools": "poky/scripts",
+        "android": "android",
+        "vendor": "android/vendor",
+    }
+)
+
+
+@pytest.mark.parametrize(
+    "word, bookmark",
+    [("andr", "android"), ("vndr", "vendor"), ("andriod", "android")],
+)
+def test_unique_match_is_resolved(word, bookmark):
+    """A unique prefix or a clearly most similar bookmark is picked."""
+    assert workspace_bookmark_match.match(word, BOOKMARKS, {}) == bookmark
+
+
+def test_ambiguous_match_lists_candidates():
+    """Bookmarks matching equally well are suggested instead of picked."""
+    with pytest.raises(workspace_bookmark_match.NoMatchError) as error:
+        workspace_bookmark_match.match("bui", BOOKMARKS, {})
+
+    assert error.value.candidates == ["build", "build-tools"]
+
+
+def test_exact_mode_disables_matching():
+    """WORKSPACE_BOOKMARK_MATCH=exact only accepts bookmarked names."""
+    environ = {"WORKSPACE_BOOKMARK_MATCH": "exact"}
+    with pytest.raises(workspace_bookmark_match.NoMatchError) as error:
+        workspace_bookmark_match.match("andr", BOOKMARKS, environ)
+
+    assert error.value.candidates == []
+
+
+def test_jump_by_abbreviation(
+    monkeypatch, capsys, _cwd_inside_repo_workspace, build_directory
+):
+    """g goes to the abbreviated bookmark or suggests the candidates."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", BOOKMARKS)
+
+    assert workspace_bookmark.main("buidl/tmp") == 0
+    assert capsys.readouterr().out == f"{build_directory}/tmp\n"
+    assert workspace_bookmark.main("bui") == 2
+    assert capsys.readouterr().err == (
+        'Warning: There is no "bui" in WORKSPACE_BOOKMARKS.\n'
+        "Did you mean:\n"
+        "    build\n"
+        "    build-tools\n"
+    )
+
+
+def test_match_index_of_large_table_is_stored(monkeypatch, _cache_directory):
+    """Large tables are matched through files instead of parsing them again."""
+    monkeypatch.setattr(workspace_bookmark_cache, "BOOKMARK_INDEX_THRESHOLD", 0)
+    indexes = []
+    for _ in range(2):
+        workspace_bookmark_cache.bookmark_table.cache_clear()
+        workspace_bookmark_match.match_index.cache_clear()
+        index = workspace_bookmark_match.match_index(BOOKMARKS, str(_cache_directory))
+        assert index.similar("vndr") == ["vendor"]
+        assert index.prefixed("bui") == ["build", "build-tools"]
+        assert index.neighbours("c") == ["build", "build-tools", "vendor"]
+        indexes.append(index)
+
+    assert isinstance(indexes[-1], workspace_bookmark_match.StoredMatchIndex)
+
+
+def test_empty_name_matches_nothing(monkeypatch, capsys, _cwd_inside_repo_workspace):
+    """An empty name is not a prefix of the only bookmark, as in 'g /x'."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "poky/build"}')
+
+    assert workspace_bookmark.main("/x") == 2
+    assert capsys.readouterr().out == ""
+
+
+def test_no_match_suggests_neighbours(monkeypatch, capsys, _cwd_inside_repo_workspace):
+    """Without candidates the bookmarks sorted next to the name are listed."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", BOOKMARKS)
+
+    assert workspace_bookmark.main("zzzz") == 2
+    assert capsys.readouterr().err == (
+        'Warning: There is no "zzzz" in WORKSPACE_BOOKMARKS.\n'
+        "Bookmarks next to it:\n"
+        "    build-tools\n"
+        "    vendor\n"
+        "Try setting it:\n"
+        '    "zzzz": "<YOUR PATH>"\n'
+    )
+
+
+@pytest.mark.parametrize(
+    "destination, path",
+    [
+        ("build/t/w/cortexa", "tmp/work/cortexa57-poky-linux"),
+        ("build/TMP/Work", "tmp/work"),
+        ("build/tmp/work/c", "tmp/work/c"),
+        ("build/s/x", "s/x"),
+    ],
+)
+def test_abbreviated_path_is_spelled_out(
+    monkeypatch, capsys, _cwd_inside_repo_workspace, build_directory, destination, path
+):
+    """Unique prefixes, also ignoring case, stand for directories below bookmarks."""
+    for directory in (
+        "tmp/work/cortexa57-poky-linux",
+        "tmp/work/core2-64",
+        "sources",
+        "scripts",
+    ):
+        (build_directory / directory).mkdir(parents=True)
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", BOOKMARKS)
+
+    assert workspace_bookmark.main(destination) == 0
+    assert capsys.readouterr().out == f"{build_directory}/{path}\n"
+
+
+def test_exact_mode_keeps_paths(
+    monkeypatch, capsys, _cwd_inside_repo_workspace, build_directory
+):
+    """WORKSPACE_BOOKMARK_MATCH=exact appends paths as they are."""
+    (build_directory / "tmp").mkdir()
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", BOOKMARKS)
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_MATCH", "exact")
+
+    assert workspace_bookmark.main("build/t") == 0
+    assert capsys.readouterr().out == f"{build_directory}/t\n"
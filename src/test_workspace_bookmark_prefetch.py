@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Test the prefetch of the metadata of a jump destination."""
+import workspace_bookmark
+import workspace_bookmark_prefetch
+
+
+def test_prefetch_lists_levels_below_destination(tmp_path):
+    """Hidden directories and the ones too deep are not listed."""
+    for directory in ("a/b/c", "d", ".git/objects"):
+        (tmp_path / directory).mkdir(parents=True)
+
+    assert workspace_bookmark_prefetch.prefetch(str(tmp_path), 0, {}) == 1
+    assert workspace_bookmark_prefetch.prefetch(str(tmp_path), 1, {}) == 3
+    assert workspace_bookmark_prefetch.prefetch(str(tmp_path), 5, {}) == 5
+
+
+def test_prefetch_is_throttled_per_destination(monkeypatch, tmp_path):
+    """A destination prefetched recently is not prefetched again."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_PREFETCH", "2")
+    calls = []
+    monkeypatch.setattr(
+        workspace_bookmark_prefetch,
+        "prefetch",
+        lambda directory, levels, environ: calls.append((directory, levels)),
+    )
+    (tmp_path / "other").mkdir()
+
+    for directory in (tmp_path, tmp_path, tmp_path / "other"):
+        assert workspace_bookmark.cli(["--prefetch", str(directory)]) == 0
+
+    assert calls == [(str(tmp_path), 2), (str(tmp_path / "other"), 2)]
+
+
+def test_prefetch_is_opt_in(monkeypatch, tmp_path):
+    """Without WORKSPACE_BOOKMARK_PREFETCH nothing is prefetched."""
+    monkeypatch.delenv("WORKSPACE_BOOKMARK_PREFETCH", raising=False)
+    monkeypatch.setattr(workspace_bookmark_prefetch, "prefetch", None)
+
+    assert workspace_bookmark.cli(["--prefetch", str(tmp_path)]) == 0
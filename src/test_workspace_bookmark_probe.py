@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Test probes made concurrently with a timeout."""
+import os
+import threading
+import time
+
+import pytest
+
+import workspace_bookmark
+import workspace_bookmark_probe
+
+
+@pytest.fixture(name="hanging")
+def hang_probes_of(monkeypatch):
+    """Make probes of the paths added to the returned set hang until the test ends."""
+    paths = set()
+    release = threading.Event()
+    listdir, isdir = os.listdir, os.path.isdir
+
+    def hanging(function):
+        def probe(path):
+            if str(path) in paths:
+                release.wait()
+            return function(path)
+
+        probe.__name__ = function.__name__
+        return probe
+
+    monkeypatch.setattr(os, "listdir", hanging(listdir))
+    monkeypatch.setattr(os.path, "isdir", hanging(isdir))
+    yield paths
+    release.set()
+
+
+def test_hung_candidate_is_skipped(hanging, tmp_path, _cache_directory):
+    """A candidate which doesn't answer in time loses to the next one."""
+    preferred, backup = tmp_path / "nfs" / "build", tmp_path / "build"
+    preferred.mkdir(parents=True)
+    backup.mkdir()
+    hanging.add(str(preferred))
+    probes = workspace_bookmark_probe.ConcurrentProbes(0.05, str(_cache_directory))
+
+    assert probes.first_directory([str(preferred), str(backup)]) == str(backup)
+
+    # The next jump doesn't wait for the hung directory nor anything below it.
+    probes = workspace_bookmark_probe.ConcurrentProbes(60, str(_cache_directory))
+    assert probes.is_hung(str(preferred / "tmp"))
+    assert probes.first_directory([str(preferred), str(backup)]) == str(backup)
+
+
+def test_jump_from_hung_directory(
+    monkeypatch, hanging, build_directory, _cwd_inside_repo_workspace
+):
+    """A directory which can't be listed in time doesn't prevent a jump."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "poky/build"}')
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_PROBE_TIMEOUT", "0.05")
+    hanging.add(os.getcwd())
+
+    assert workspace_bookmark.get_bookmarked_path("build") == str(build_directory)
+
+
+def test_probes_shared_by_threads(hanging, tmp_path):
+    """Threads probing at once share one probe per path and the hung ones."""
+    directories = [tmp_path / str(number) for number in range(16)]
+    for directory in directories:
+        directory.mkdir()
+    hanging.update(str(directory) for directory in directories)
+    probes = workspace_bookmark_probe.ConcurrentProbes(0.01, None)
+    errors = []
+
+    def probe():
+        try:
+            for directory in directories:
+                assert not probes.isdir(str(directory))
+                probes.is_hung(str(directory / "tmp"))
+        except Exception as error:  # pylint: disable=broad-except
+            errors.append(error)
+
+    threads = [threading.Thread(target=probe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(probes.probes) == len(directories)
+    assert probes.hung and set(probes.hung) <= set(map(str, directories))
+
+
+def test_answers_are_not_kept(tmp_path):
+    """Directories made or unhung since the last probe are seen by the next one."""
+    preferred, backup = tmp_path / "a" / "build", tmp_path / "build"
+    backup.mkdir()
+    probes = workspace_bookmark_probe.ConcurrentProbes(60, None)
+    candidates = [str(preferred), str(backup)]
+    assert probes.first_directory(candidates) == str(backup)
+
+    preferred.mkdir(parents=True)
+    assert probes.first_directory(candidates) == str(preferred)
+
+    probes.hung[str(tmp_path / "a")] = time.time() - 1
+    assert not probes.is_hung(str(preferred))
+    assert probes.isdir(str(preferred))
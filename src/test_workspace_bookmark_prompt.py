@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Test the prompt segment."""
+import os
+
+import workspace_bookmark
+import workspace_bookmark_prompt
+
+
+def test_prompt_inside_and_outside_workspace(
+    monkeypatch, capsys, repo_workspace, build_directory, tmp_path
+):
+    """The workspace and the path in it are printed, nothing outside of one."""
+    monkeypatch.chdir(build_directory)
+    assert workspace_bookmark.cli(["--prompt"]) == 0
+    assert capsys.readouterr().out == f"{repo_workspace.name}/poky/build\n"
+    monkeypatch.chdir(repo_workspace)
+    assert workspace_bookmark.cli(["--prompt"]) == 0
+    assert capsys.readouterr().out == f"{repo_workspace.name}\n"
+    monkeypatch.chdir(tmp_path)
+    assert workspace_bookmark.cli(["--prompt"]) == 0
+    assert capsys.readouterr() == ("", "")
+
+
+def test_prompt_caches_roots_and_their_absence(monkeypatch, tmp_path, _cache_directory):
+    """Directories are listed again only once one of them changes."""
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(
+        "os.listdir", lambda path: listings.append(path) or listdir(path)
+    )
+    # Creating the cache would change the mtime of an ancestor.
+    (_cache_directory / "prompt").mkdir(parents=True)
+    build = tmp_path / "poky" / "build"
+    build.mkdir(parents=True)
+    environ = dict(os.environ)
+
+    assert workspace_bookmark_prompt.prompt(environ, str(build)) == ""
+    walked = len(listings)
+    assert workspace_bookmark_prompt.prompt(environ, str(build)) == ""
+    assert len(listings) == walked
+
+    (build.parent / ".repo").mkdir()
+    assert workspace_bookmark_prompt.prompt(environ, str(build)) == "poky/build\n"
+    assert len(listings) > walked
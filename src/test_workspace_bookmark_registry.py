@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Test the registry of workspaces and jumps between workspaces."""
+import os
+
+import pytest
+
+import workspace_bookmark
+import workspace_bookmark_registry
+
+
+@pytest.fixture(name="bases")
+def make_workspaces(monkeypatch, tmp_path):
+    """Create workspaces below two base directories and register the bases."""
+    for workspace in ("work/a/android", "work/b/android", "checkouts/yocto"):
+        (tmp_path / workspace / ".repo").mkdir(parents=True)
+        (tmp_path / workspace / "poky" / "build").mkdir(parents=True)
+    # Directories inside of a workspace are never scanned.
+    (tmp_path / "work/a/android/nested/.repo").mkdir(parents=True)
+    bases = [tmp_path / "work", tmp_path / "checkouts"]
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_BASES", ":".join(map(str, bases)))
+    return bases
+
+
+def test_scan_names_workspaces(bases, capsys):
+    """Workspaces are named by the shortest unique tail of their paths."""
+    work, checkouts = bases
+
+    assert workspace_bookmark.cli(["--scan"]) == 0
+    assert capsys.readouterr().out == (
+        f"a/android\t{work}/a/android\n"
+        f"b/android\t{work}/b/android\n"
+        f"yocto\t{checkouts}/yocto\n"
+    )
+
+
+def test_rescan_lists_only_changed_directories(monkeypatch, bases, _cache_directory):
+    """Directories with an unchanged mtime are not listed again."""
+    environ = dict(os.environ)
+    workspace_bookmark_registry.update(environ, str(_cache_directory))
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or scandir(path))
+    (bases[1] / "zephyr" / ".repo").mkdir(parents=True)
+
+    workspaces = workspace_bookmark_registry.update(environ, str(_cache_directory))
+
+    assert workspaces["zephyr"] == str(bases[1] / "zephyr")
+    assert sorted(scans) == [str(bases[1]), str(bases[1] / "zephyr")]
+
+
+def test_jump_into_another_workspace(
+    monkeypatch, bases, capsys, _cwd_outside_any_workspace
+):
+    """g WORKSPACE:BOOKMARK works outside of any workspace."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "poky/build"}')
+
+    assert workspace_bookmark.main("yocto:build/tmp") == 0
+    assert capsys.readouterr().out == f"{bases[1]}/yocto/poky/build/tmp\n"
+    assert workspace_bookmark.main("b/android:") == 0
+    assert capsys.readouterr().out == f"{bases[0]}/b/android\n"
+    assert workspace_bookmark.main("android:build") == 1
+    assert capsys.readouterr().err.startswith(
+        'Warning: There is no "android" workspace in the registry.'
+    )
+
+
+def test_bookmark_with_colon_is_not_a_workspace(
+    monkeypatch, capsys, build_directory, _cwd_inside_repo_workspace
+):
+    """A destination starting with a bookmark is never split at its ':'."""
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"a:b": "poky/build"}')
+
+    assert workspace_bookmark.main("a:b/tmp") == 0
+    assert capsys.readouterr().out == f"{build_directory}/tmp\n"
+
+
+def test_miss_keeps_registry(monkeypatch, bases, _cache_directory):
+    """Unknown workspaces rescan at most once in a while and never without bases."""
+    environ = dict(os.environ)
+    workspace_bookmark_registry.update(environ, str(_cache_directory))
+    scans = []
+    update = workspace_bookmark_registry.update
+    monkeypatch.setattr(
+        workspace_bookmark_registry,
+        "update",
+        lambda environ, cache: scans.append(cache) or update(environ, cache),
+    )
+
+    with pytest.raises(KeyError):
+        workspace_bookmark_registry.locate("zephyr", environ)
+    assert not scans
+    monkeypatch.setattr(workspace_bookmark_registry, "RESCAN_INTERVAL", 0)
+    del environ["WORKSPACE_BOOKMARK_BASES"]
+    with pytest.raises(KeyError):
+        workspace_bookmark_registry.locate("zephyr", environ)
+    assert len(scans) == 1
+    assert workspace_bookmark_registry.locate("yocto", environ) == str(
+        bases[1] / "yocto"
+    )
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Test that the shell function resolves bookmarks like a run of Python would."""
+import json
+import os
+import subprocess
+
+import pytest
+
+import workspace_bookmark
+import workspace_bookmark_shell
+
+BOOKMARKS = {
+    "build": "poky/build/",
+    "root": "./",
+    "it's": "android",
+    "optional": "{nothing/}poky",
+    "outside": "/tmp",
+}
+
+
+def run_shell_function(destination: str, cwd: str) -> subprocess.CompletedProcess:
+    """Run _g_fast in bash, return the path it resolved on stdout."""
+    definition = workspace_bookmark_shell.emit(BOOKMARKS, [".repo"], "bash")
+    return subprocess.run(
+        ["bash", "-c", definition + '_g_fast "$1" && echo "$_g_fast_path"', "_"]
+        + [destination],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        check=False,
+        universal_newlines=True,
+    )
+
+
+@pytest.mark.parametrize("destination", ["build", "build/tmp", "root", "", "it's"])
+def test_shell_resolves_like_python(
+    monkeypatch, capsys, destination, build_directory, _cwd_inside_repo_workspace
+):
+    """Plain bookmarks are resolved in the shell to the same path."""
+    (build_directory / "tmp").mkdir()
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", json.dumps(BOOKMARKS))
+    workspace_bookmark.main(destination)
+
+    result = run_shell_function(destination, os.getcwd())
+
+    assert result.returncode == 0
+    assert result.stdout == capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "destination",
+    ["optional", "outside", "nothing", "-", "other:build", "**/x", "build/tm"],
+)
+def test_shell_leaves_the_rest_to_python(destination, _cwd_inside_repo_workspace):
+    """Optional segments, misses and other kinds of destinations return 255."""
+    assert run_shell_function(destination, os.getcwd()).returncode == 255
+
+
+def test_shell_leaves_workspaces_with_bookmark_files_to_python(
+    repo_workspace, _cwd_inside_repo_workspace
+):
+    """Bookmarks of a workspace may override the ones compiled in."""
+    (repo_workspace / ".workspace-bookmarks.json").write_text("{}")
+
+    assert run_shell_function("build", os.getcwd()).returncode == 255
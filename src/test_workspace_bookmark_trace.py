@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Test tracing of jumps and the summary of a trace."""
+import json
+
+import workspace_bookmark
+
+
+def test_jumps_are_traced(monkeypatch, capsys, tmp_path, _cwd_inside_repo_workspace):
+    """Every jump appends a line with its timings, probes and cache use."""
+    trace = tmp_path / "trace.jsonl"
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_TRACE", str(trace))
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "{nothing/}poky/build"}')
+
+    assert workspace_bookmark.main("build") == 0
+    assert workspace_bookmark.main("build") == 0
+    assert workspace_bookmark.main("the moon") == 2
+    capsys.readouterr()
+
+    first, second, third = map(json.loads, trace.read_text().splitlines())
+    assert first["destination"] == "build" and first["status"] == 0
+    assert set(first["phases"]) == {"roots", "bookmark", "resolve"}
+    assert first["total_ms"] >= sum(first["phases"].values())
+    assert first["cache"] == {"roots": "miss", "bookmarks": "off"}
+    assert first["listed"] > 0 and first["stated"] == 2
+    assert first["tier"] == 1
+    assert second["cache"]["roots"] == "hit" and second["listed"] == 0
+    assert third["status"] == 2
+
+    assert workspace_bookmark.cli(["--stats", str(trace)]) == 0
+    report = capsys.readouterr().out.splitlines()
+    assert report[0] == "3 jumps"
+    assert report[1].split() == ["ms", "p50", "p95", "p99"]
+    assert [line.split()[0] for line in report[2:7]] == [
+        "total",
+        "startup",
+        "roots",
+        "bookmark",
+        "resolve",
+    ]
+    assert report[7] == "roots cache hits: 67% of 3"
+
+
+def test_concurrent_probes_are_traced(
+    monkeypatch, capsys, tmp_path, repo_workspace, _cwd_inside_repo_workspace
+):
+    """The tier is the candidate found even if every one was probed at once."""
+    trace = tmp_path / "trace.jsonl"
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_TRACE", str(trace))
+    monkeypatch.setenv("WORKSPACE_BOOKMARK_PROBE_TIMEOUT", "60")
+    monkeypatch.setenv("WORKSPACE_BOOKMARKS", '{"build": "{a/}build"}')
+    (repo_workspace / "a" / "build").mkdir(parents=True)
+    (repo_workspace / "build").mkdir()
+
+    assert workspace_bookmark.main("build") == 0
+    capsys.readouterr()
+
+    record = json.loads(trace.read_text())
+    assert record["tier"] == 0 and record["stated"] == 1
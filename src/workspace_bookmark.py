@@ -6,51 +6,319 @@ Example usage:
     g - goto workspace root
     g build - goto poky/build
     g android - goto android
+    g - - goto where the jump before the last one went, see
+        workspace_bookmark_history
 
 This script works along with a function defined in .bashrc
 g () { p=$(workspace-bookmark.py $1) && cd $p || echo $p; }
+
+Modes:
+    --daemon [SOCKET] - answer requests from g without starting Python each time
+    --complete bash|zsh WORD - print completions of WORD for g
+    --batch [--null|--json] [DESTINATION...] - resolve many destinations at once
+    --scan - register workspaces for jumps like g WORKSPACE:BOOKMARK
+    --stats [TRACE] - summarize latencies logged to WORKSPACE_BOOKMARK_TRACE
+    --history - list recent jumps made in the current workspace
+    --index - update the directory index for jumps like g bookmark/**/name
+    --emit-shell bash|zsh - print a shell function resolving most jumps itself
+    --doctor [DIRECTORY...] - check every bookmark in every workspace
+    --list - list bookmarks with their paths, for pickers like fzf
+    --prompt - print the workspace and the path in it, for PS1
+    --each BOOKMARK -- COMMAND... - run a command in a bookmark of every workspace
+    --prefetch DIRECTORY - warm caches of a network file system after a jump
+
+Bookmarks may also be defined in files instead of WORKSPACE_BOOKMARKS, see
+workspace_bookmark_config.
+
+A destination which isn't bookmarked may be a project of the repo manifest, see
+workspace_bookmark_manifest, or an abbreviation of a bookmark, see
+workspace_bookmark_match.
 """
 import json
-import copy
 import re
 import os
 import sys
-from typing import Dict
+from functools import lru_cache
+
+from workspace_bookmark_cache import bookmark_table, cache_directory, root_cache
+
+# Importing typing alone takes a noticeable part of the time a jump takes.
+# Annotations are strings so that it is only imported by type checkers.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import (
+        Any,
+        Callable,
+        Dict,
+        Iterable,
+        Iterator,
+        List,
+        Mapping,
+        Optional,
+        Tuple,
+        Union,
+    )
+
+    from workspace_bookmark_cache import RootCache
+
+# Options which switch the script into a different mode of operation. The modules
+# implementing them are imported only when requested so that the common path of
+# printing a bookmark stays cheap.
+MODES = {
+    "--daemon": "workspace_bookmark_daemon",
+    "--complete": "workspace_bookmark_complete",
+    "--batch": "workspace_bookmark_batch",
+    "--scan": "workspace_bookmark_registry",
+    "--stats": "workspace_bookmark_trace",
+    "--history": "workspace_bookmark_history",
+    "--index": "workspace_bookmark_index",
+    "--emit-shell": "workspace_bookmark_shell",
+    "--doctor": "workspace_bookmark_doctor",
+    "--list": "workspace_bookmark_list",
+    "--prompt": "workspace_bookmark_prompt",
+    "--each": "workspace_bookmark_each",
+    "--prefetch": "workspace_bookmark_prefetch",
+}
+
+
+def get_magic_files(environ: "Mapping[str, str]") -> "List[str]":
+    """
+    Return the names of files marking a workspace root in order of priority.
+
+    WORKSPACE_BOOKMARK_MAGIC_FILE is a ':' separated list, e.g. '.wsmagic:.repo'.
+    .repo is always looked for, as the last resort if it is not on the list.
+    """
+    names = environ.get("WORKSPACE_BOOKMARK_MAGIC_FILE", "").split(":") + [".repo"]
+    return list(dict.fromkeys(name for name in names if name))
+
+
+class Probes:
+    """
+    File system probes made while resolving a destination, one at a time.
+
+    See workspace_bookmark_probe for probes made concurrently, with a timeout.
+    """
+
+    def listdir(self, path: str) -> "List[str]":
+        """Return names of entries in a directory."""
+        return os.listdir(path)
+
+    def isdir(self, path: str) -> bool:
+        """Tell whether path is a directory."""
+        return os.path.isdir(path)
+
+    def first_directory(self, candidates: "Iterable[str]") -> "Optional[str]":
+        """Return the first of candidates which is a directory or None."""
+        return next((path for path in candidates if self.isdir(path)), None)
+
+    def phase(self, name: str):
+        """Mark the end of a phase of a jump, see workspace_bookmark_trace."""
+
+    def finish(self, destination: str, status: int):
+        """Mark the end of a jump to destination which exits with status."""
+
+
+SEQUENTIAL_PROBES = Probes()
+
+
+def get_probes(environ: "Mapping[str, str]") -> Probes:
+    """
+    Return probes for a jump.
+
+    They are made concurrently if WORKSPACE_BOOKMARK_PROBE_TIMEOUT is set and
+    traced if WORKSPACE_BOOKMARK_TRACE is.
+    """
+    probes = SEQUENTIAL_PROBES
+    timeout = environ.get("WORKSPACE_BOOKMARK_PROBE_TIMEOUT")
+    if timeout:
+        # pylint: disable-next=import-outside-toplevel
+        from workspace_bookmark_probe import ConcurrentProbes
+
+        probes = ConcurrentProbes(float(timeout), cache_directory(environ))
+    if environ.get("WORKSPACE_BOOKMARK_TRACE"):
+        # pylint: disable-next=import-outside-toplevel
+        from workspace_bookmark_trace import Trace
+
+        probes = Trace(probes, environ)
+    return probes
+
+
+def find_workspace_roots(
+    magic_files: "List[str]",
+    start: str,
+    cache: "Optional[RootCache]" = None,
+    probes: Probes = SEQUENTIAL_PROBES,
+) -> "Dict[str, str]":
+    """
+    Return the closest directory containing each of the magic files.
+
+    Ancestors of start are listed at most once no matter how many magic files
+    are looked for. Magic files which are not found are left out.
+    """
+    roots = {}
+    if cache is not None:
+        for magic_file in magic_files:
+            root = cache.lookup(magic_file, start)
+            if root is not None:
+                roots[magic_file] = root
+    missing = [magic_file for magic_file in magic_files if magic_file not in roots]
+    visited = []
+    directory = start
+    while missing and directory:
+        visited.append(directory)
+        entries = probes.listdir(directory)
+        for magic_file in [
+            magic_file for magic_file in missing if magic_file in entries
+        ]:
+            roots[magic_file] = directory
+            missing.remove(magic_file)
+            if cache is not None:
+                cache.store(magic_file, visited, directory)
+        directory = "/".join(directory.split("/")[:-1])
+    if cache is not None:
+        cache.save()
+    return roots
+
+
+def find_workspace_root(
+    magic_file: str, start: str, cache: "Optional[RootCache]" = None
+) -> str:
+    """
+    Return the closest directory containing magic_file, starting from start.
+
+    FileNotFoundError is raised if there is no such directory.
+    """
+    try:
+        return find_workspace_roots([magic_file], start, cache)[magic_file]
+    except KeyError as exception:
+        raise FileNotFoundError(magic_file) from exception
 
 
 def path_to(
-    destination: str, bookmarks: Dict[str, str], magic_file: str = ".repo"
+    destination: str,
+    bookmarks: "Dict[str, str]",
+    magic_file: str = ".repo",
+    start: "Optional[str]" = None,
+    cache: "Optional[RootCache]" = None,
 ) -> str:
     """Return path to desired destination based on a lookup table."""
-    workspace_root = os.getcwd()
-    while magic_file not in os.listdir(workspace_root):
-        workspace_root = "/".join(workspace_root.split("/")[:-1])
+    start = os.getcwd() if start is None else start
+    workspace_root = find_workspace_root(magic_file, start, cache)
     path = os.path.join(workspace_root, bookmarks[destination])
     return os.path.abspath(path)
 
 
-def expand_optional_prefix(bookmarks: Dict[str, str]) -> Dict[str, str]:
+@lru_cache(maxsize=None)
+def compile_pattern(path: str) -> "Tuple[Tuple[str, ...], ...]":
+    """
+    Split a bookmarked path into groups of alternatives, in order of preference.
+
+    Text in '{}' is optional and '|' separates alternatives inside of them, so
+    '{case1|case2}/poky/{meta/}build' becomes
+    (('case1', 'case2', ''), ('/poky/',), ('meta/', ''), ('build',)).
+    Stray braces are dropped.
+
+    Bookmarks are compiled one at a time, when they are looked up, so the cost
+    of a jump doesn't grow with the number of bookmarks.
+    """
+    groups = []
+    for number, text in enumerate(re.split("{([^{}]*)}", path)):
+        if number % 2:
+            groups.append(tuple(dict.fromkeys(text.split("|") + [""])))
+        elif text:
+            groups.append((text.replace("{", "").replace("}", ""),))
+    return tuple(groups)
+
+
+def extend_variant(prefix: str, part: str, number: int) -> str:
+    """
+    Return the variant prefix of a bookmarked path followed by its part number.
+
+    A '/' leading a later part only because the parts before it are empty, as in
+    '{a|}/x', is dropped so that the variant stays below the workspace root.
+    """
+    if number and not prefix:
+        return part.lstrip("/")
+    return prefix + part
+
+
+def join_variant(parts: "Iterable[str]") -> str:
+    """Return a variant of a bookmarked path from one alternative per group."""
+    variant = ""
+    for number, part in enumerate(parts):
+        variant = extend_variant(variant, part, number)
+    return variant
+
+
+def optional_prefix_variants(path: str) -> "Tuple[str, str]":
+    """Return the most and the least preferred variant of a bookmarked path."""
+    groups = compile_pattern(path)
+    return (
+        join_variant(group[0] for group in groups),
+        join_variant(group[-1] for group in groups),
+    )
+
+
+def expand_pattern(
+    root: str,
+    groups: "Tuple[Tuple[str, ...], ...]",
+    isdir: "Callable[[str], bool]",
+) -> "Iterator[str]":
+    """
+    Yield paths a compiled bookmark may lead to below root, most preferred first.
+
+    The tree is walked group by group. Once an alternative is chosen the
+    directory it completes is checked, if later groups still have choices to
+    make, and every path below a missing directory is skipped. So k optional
+    groups cost far fewer than 2^k checks when most of them don't exist.
+    """
+    # The number of groups with a choice to make after each group.
+    choices_after = [0] * len(groups)
+    for number in range(len(groups) - 2, -1, -1):
+        choices_after[number] = choices_after[number + 1] + (
+            len(groups[number + 1]) > 1
+        )
+
+    def walk(number: int, prefix: str) -> "Iterator[str]":
+        if number == len(groups):
+            yield os.path.abspath(os.path.join(root, prefix))
+            return
+        following = groups[number + 1][0] if number + 1 < len(groups) else ""
+        for alternative in groups[number]:
+            variant = extend_variant(prefix, alternative, number)
+            path = variant
+            if alternative and len(groups[number]) > 1 and choices_after[number]:
+                if not (path.endswith("/") or following.startswith("/")):
+                    path = os.path.dirname(path)
+                if path and not isdir(os.path.join(root, path.rstrip("/"))):
+                    continue
+            yield from walk(number + 1, variant)
+
+    return walk(0, "")
+
+
+def expand_optional_prefix(bookmarks: "Dict[str, str]") -> "Dict[str, str]":
     """
     The lookup table comes with paths which contain a special syntax '{}'.
-    This syntax can only begin at the beginning of the path.
-    The portion inside '{}' is optional. Expand the optional part by removing
-    '{' and '}'. Thus creating a lookup table for preferred jump location.
+    The portion inside '{}' is optional. Expand the optional parts by taking
+    their first alternative. Thus creating a lookup table for preferred jump
+    location.
     """
-    bookmarks = copy.deepcopy(bookmarks)
-    for bookmark, path in bookmarks.items():
-        bookmarks[bookmark] = path.replace("{", "").replace("}", "")
-    return bookmarks
+    return {
+        bookmark: optional_prefix_variants(path)[0]
+        for bookmark, path in bookmarks.items()
+    }
 
 
-def remove_optional_prefix(bookmarks: Dict[str, str]) -> Dict[str, str]:
+def remove_optional_prefix(bookmarks: "Dict[str, str]") -> "Dict[str, str]":
     """
-    Return bookmarks with but '{''}' and everything inside them removed. This creates
+    Return bookmarks with '{''}' and everything inside them removed. This creates
     a backup lookup table in case the preferred location is not found.
     """
-    bookmarks = copy.deepcopy(bookmarks)
-    for bookmark, path in bookmarks.items():
-        bookmarks[bookmark] = re.sub("{.*}", "", path)
-    return bookmarks
+    return {
+        bookmark: optional_prefix_variants(path)[1]
+        for bookmark, path in bookmarks.items()
+    }
 
 
 class WorkspaceRootNotFoundError(Exception):
@@ -61,104 +329,479 @@ class BookmarkNotFoundError(Exception):
     """This error is thrown when the requested bookmark is not found."""
 
 
-def get_bookmarked_path(desired_destination: str = "") -> str:
+def resolve(
+    path: str,
+    roots: "Dict[str, str]",
+    magic_files: "List[str]",
+    probes: Probes = SEQUENTIAL_PROBES,
+) -> str:
     """
-    Print path to destination directory.
+    Return the first existing candidate for a bookmarked path.
 
-    This is expected to be later picked up by cd.
+    For each magic file, in order of priority, the variants of the path are
+    tried in order of preference, see compile_pattern. If none of the candidates
+    exists the least preferred one of the last workspace is returned and cd
+    reports the error.
     """
-    default_destination = {"root": "./"}
-    try:
-        magic_file = os.environ["WORKSPACE_BOOKMARK_MAGIC_FILE"]
-    except KeyError:
-        magic_file = ".repo"
+    groups = compile_pattern(path)
+    workspaces = [
+        roots[magic_file] for magic_file in magic_files if magic_file in roots
+    ]
+    known: "Dict[str, bool]" = {}
+
+    def isdir(directory: str) -> bool:
+        if directory not in known:
+            known[directory] = probes.isdir(directory)
+        return known[directory]
+
+    candidates = (
+        candidate
+        for workspace in workspaces
+        for candidate in expand_pattern(workspace, groups, isdir)
+    )
+    fallback = os.path.join(workspaces[-1], optional_prefix_variants(path)[1])
+    return probes.first_directory(candidates) or os.path.abspath(fallback)
+
+
+@lru_cache(maxsize=8)
+def load_bookmarks(bookmarks: str) -> "Dict[str, str]":
+    """
+    Parse WORKSPACE_BOOKMARKS.
+
+    The result is cached so that a long running process, like the resolver
+    daemon, parses the same table only once. Callers must not modify it.
+    """
+    return json.loads(bookmarks)
+
+
+def lookup_bookmark(name: str, bookmarks: str, environ: "Mapping[str, str]") -> str:
+    """
+    Return the path bookmarked as name or as the bookmark name abbreviates.
+
+    KeyError is raised if there is no such bookmark. If there are bookmarks name
+    may have meant the exception lists them as its candidates.
+    """
+    table = bookmark_table(bookmarks, cache_directory(environ))
     try:
-        bookmarks = os.environ["WORKSPACE_BOOKMARKS"]
+        return table[name]
     except KeyError:
-        bookmarks = json.dumps(default_destination)
-        print(
-            "Warning: WORKSPACE_BOOKMARKS is not set.\n"
-            "Try setting it to something similar to this:\n"
-            "export WORKSPACE_BOOKMARKS='{\n"
-            '  "build": "poky/build",\n'
-            '  "android": "android",\n'
-            '  "manifest": ".repo/manifests"\n'
-            "}'",
-            file=sys.stderr,
-        )
-    if desired_destination == "":
-        # When g is called without parameters
-        # $ g
-        # The first parameter $1 is actually ""
-        desired_destination = list(default_destination)[0]
-        overwritten_bookmarks = json.loads(bookmarks)
-        overwritten_bookmarks[desired_destination] = default_destination[
-            desired_destination
-        ]
-        bookmarks = json.dumps(overwritten_bookmarks)
-
-    # There are many edge cases here but none of them are considered.
-    # 1. Bookmark has a '/' in it's name.
-    # 2. There are two or more bookmarks named "one" and "one/one".
-    # 3. A bookmark is in the path destination_bookmark/path/bookmark/
-    bookmark_path = desired_destination.split("/")
-    if len(bookmark_path) > 1:
-        path_to_append = "/" + "/".join(bookmark_path[1:])
+        # pylint: disable-next=import-outside-toplevel
+        from workspace_bookmark_match import match
+
+        return table[match(name, bookmarks, environ)]
+
+
+def lookup_destination(
+    name: str,
+    path_to_append: str,
+    bookmarks: str,
+    environ: "Mapping[str, str]",
+    roots: "Dict[str, str]",
+) -> "Tuple[str, str]":
+    """
+    Return the path the destination name + path_to_append starts at and the rest.
+
+    Projects of the repo manifest are considered, if enabled, when name is not
+    bookmarked. They may span more than the first part of the destination.
+    With the directory index enabled '**' stands for the workspace root and is
+    kept in the rest, see expand_globstar.
+    """
+    if name == "**" and environ.get("WORKSPACE_BOOKMARK_INDEX"):
+        return "./", "/**" + path_to_append
+    if (
+        environ.get("WORKSPACE_BOOKMARK_MANIFEST")
+        and ".repo" in roots
+        and name not in bookmark_table(bookmarks, cache_directory(environ))
+    ):
+        # pylint: disable-next=import-outside-toplevel
+        from workspace_bookmark_manifest import lookup_project
+
+        try:
+            return lookup_project(
+                name + path_to_append, roots[".repo"], cache_directory(environ)
+            )
+        except KeyError:
+            pass
+    return lookup_bookmark(name, bookmarks, environ), path_to_append
+
+
+def expand_globstar(
+    path: str, pattern: str, environ: "Mapping[str, str]", roots: "Dict[str, str]"
+) -> "Tuple[str, str]":
+    """
+    Return the directory below path pattern matches and the rest to append.
+
+    Patterns with a '**' part are looked up in the directory index of the
+    workspace, if it is enabled, see workspace_bookmark_index. Other patterns
+    are appended as they are.
+    """
+    if not environ.get("WORKSPACE_BOOKMARK_INDEX") or "**" not in pattern.split("/"):
+        return path, pattern
+    # pylint: disable-next=import-outside-toplevel
+    from workspace_bookmark_index import find
+
+    return find(path, pattern, environ, roots), ""
+
+
+def expand_abbreviations(
+    path: str, path_to_append: str, environ: "Mapping[str, str]", probes: Probes
+) -> str:
+    """
+    Return path_to_append with the parts it abbreviates spelled out.
+
+    Directories below path are listed only if path + path_to_append is not a
+    directory already, see workspace_bookmark_match.match_path.
+    """
+    if (
+        not path_to_append.strip("/")
+        or environ.get("WORKSPACE_BOOKMARK_MATCH") == "exact"
+        or probes.isdir(path + path_to_append)
+    ):
+        return path_to_append
+    # pylint: disable-next=import-outside-toplevel
+    from workspace_bookmark_match import match_path
+
+    return match_path(path, path_to_append, environ)
+
+
+def bookmark_files(
+    environ: "Mapping[str, str]", roots: "Dict[str, str]", magic_files: "List[str]"
+) -> "List[str]":
+    """
+    Return paths of files bookmarks may be defined in, least important first.
+
+    These are the file of the user, WORKSPACE_BOOKMARK_CONFIG or
+    bookmarks.json in the workspace-bookmark directory of the user configuration,
+    followed by .workspace-bookmarks.json in each of the roots.
+    """
+    if "WORKSPACE_BOOKMARK_CONFIG" in environ:
+        files = [environ["WORKSPACE_BOOKMARK_CONFIG"]]
     else:
-        path_to_append = ""
-    desired_destination = bookmark_path[0]
-    preferred_bookmarks = expand_optional_prefix(json.loads(bookmarks))
-    backup_bookmarks = remove_optional_prefix(json.loads(bookmarks))
-    try:
-        resulting_destination = path_to(
-            desired_destination, preferred_bookmarks, magic_file
+        config = environ.get("XDG_CONFIG_HOME") or os.path.join(
+            environ.get("HOME") or os.path.expanduser("~"), ".config"
         )
-        if not os.path.isdir(resulting_destination):
-            resulting_destination = path_to(
-                desired_destination, backup_bookmarks, magic_file
-            )
-        if not os.path.isdir(resulting_destination):
-            resulting_destination = path_to(
-                desired_destination, backup_bookmarks, ".repo"
-            )
-        final_destination = resulting_destination + path_to_append
-        return final_destination
-    except FileNotFoundError as exception:
-        print(
-            "Warning: There is no .repo directory in or above the current "
-            "directory.\nThis tool is intended to work in different "
-            "workspaces that have a common\nlayout as is often the case "
-            "with workspaces downloaded by repo. If this\nis not your "
-            "use-case switch to autojump-rs or propose an improvement to\n"
-            "this script.",
-            file=sys.stderr,
+        files = [os.path.join(config, "workspace-bookmark", "bookmarks.json")]
+    for magic_file in reversed(magic_files):
+        if magic_file in roots:
+            path = os.path.join(roots[magic_file], ".workspace-bookmarks.json")
+            if path not in files:
+                files.append(path)
+    return [path for path in files if path]
+
+
+def bookmark_sources(
+    environ: "Mapping[str, str]",
+    roots: "Dict[str, str]",
+    magic_files: "List[str]",
+    warnings: "Optional[List[str]]" = None,
+) -> "Optional[str]":
+    """
+    Return bookmarks of bookmark_files merged with WORKSPACE_BOOKMARKS.
+
+    None is returned if there are neither files nor the variable. Warnings
+    about files which can't be read are added to warnings, if given.
+    """
+    files = []
+    for path in bookmark_files(environ, roots, magic_files):
+        try:
+            files.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            continue
+    if not files:
+        return environ.get("WORKSPACE_BOOKMARKS")
+    # pylint: disable-next=import-outside-toplevel
+    from workspace_bookmark_config import merge_bookmarks
+
+    bookmarks, problems = merge_bookmarks(
+        tuple(files), environ.get("WORKSPACE_BOOKMARKS"), cache_directory(environ)
+    )
+    if warnings is not None:
+        warnings.extend(problems)
+    return bookmarks
+
+
+# Printed when no workspace root is found from the start directory.
+NO_WORKSPACE_WARNING = (
+    "Warning: There is no .repo directory in or above the current "
+    "directory.\nThis tool is intended to work in different "
+    "workspaces that have a common\nlayout as is often the case "
+    "with workspaces downloaded by repo. If this\nis not your "
+    "use-case switch to autojump-rs or propose an improvement to\n"
+    "this script.\n"
+)
+# Printed when bookmarks are neither set nor defined in files.
+NO_BOOKMARKS_WARNING = (
+    "Warning: WORKSPACE_BOOKMARKS is not set.\n"
+    "Try setting it to something similar to this:\n"
+    "export WORKSPACE_BOOKMARKS='{\n"
+    '  "build": "poky/build",\n'
+    '  "android": "android",\n'
+    '  "manifest": ".repo/manifests"\n'
+    "}'\n"
+)
+# Used when there are no bookmarks, g alone still goes to the workspace root.
+DEFAULT_BOOKMARKS = '{"root": "./"}'
+
+
+def not_bookmarked_warning(name: str, exception: KeyError) -> str:
+    """
+    Return the warning about name, which is not bookmarked.
+
+    The names come from the exception, see workspace_bookmark_match.match, so
+    the warning costs the same for any number of bookmarks.
+    """
+    warning = f'Warning: There is no "{name}" in WORKSPACE_BOOKMARKS.\n'
+    candidates = getattr(exception, "candidates", [])
+    if candidates:
+        return (
+            warning
+            + "Did you mean:\n"
+            + "".join(f"    {candidate}\n" for candidate in candidates)
         )
-        raise WorkspaceRootNotFoundError() from exception
-    except KeyError as exception:
-        proposed_bookmarks = json.loads(bookmarks)
-        proposed_bookmarks[desired_destination] = "<YOUR PATH>"
-        proposed_bookmarks = json.dumps(proposed_bookmarks, indent=2)
-        print(
-            f'Warning: There is no "{desired_destination}" in WORKSPACE_BOOKMARKS.'
-            "\nTry setting it:\n"
-            f"export WORKSPACE_BOOKMARKS='{proposed_bookmarks}'",
-            file=sys.stderr,
-            end="",
+    neighbours = getattr(exception, "neighbours", [])
+    if neighbours:
+        warning += "Bookmarks next to it:\n" + "".join(
+            f"    {neighbour}\n" for neighbour in neighbours
+        )
+    entry = json.dumps({name: "<YOUR PATH>"})[1:-1]
+    return warning + f"Try setting it:\n    {entry}\n"
+
+
+class WorkspaceResolver:
+    """
+    Resolve destinations from a start directory, for tools resolving many.
+
+    The workspace roots, bookmarks and other workspaces are looked up once, on
+    first use, and shared by every call, which may come from several threads.
+    Bookmarks, as a mapping or as JSON, and magic files may be given instead of
+    being taken from environ, which by default is a copy of os.environ. Nothing
+    is printed, WorkspaceRootNotFoundError and BookmarkNotFoundError carry the
+    warning g would print.
+    """
+
+    def __init__(
+        self,
+        start: str,
+        environ: "Optional[Mapping[str, str]]" = None,
+        bookmarks: "Optional[Union[str, Mapping[str, str]]]" = None,
+        magic_files: "Optional[List[str]]" = None,
+    ):
+        self.start = os.path.abspath(start)
+        self.environ = dict(os.environ if environ is None else environ)
+        if bookmarks is not None and not isinstance(bookmarks, str):
+            bookmarks = json.dumps(dict(bookmarks))
+        self.explicit_bookmarks = bookmarks
+        self.magic_files = (
+            get_magic_files(self.environ) if magic_files is None else magic_files
+        )
+        # Probes passed to other threads must be safe to use from them.
+        self.probes = get_probes(self.environ)
+        # threading itself takes a while to import, only its lock is needed.
+        # pylint: disable-next=import-outside-toplevel
+        from _thread import allocate_lock
+
+        self.lock = allocate_lock()
+        self.memo: "Dict[str, Any]" = {"workspaces": {}}
+
+    def roots(self) -> "Dict[str, str]":
+        """Return the workspace roots found from the start directory."""
+        with self.lock:
+            if "roots" not in self.memo:
+                self.memo["roots"] = find_workspace_roots(
+                    self.magic_files,
+                    self.start,
+                    root_cache(cache_directory(self.environ)),
+                    self.probes,
+                )
+                self.probes.phase("roots")
+            roots = self.memo["roots"]
+        if not roots:
+            raise WorkspaceRootNotFoundError(NO_WORKSPACE_WARNING)
+        return roots
+
+    def bookmarks(self) -> "Optional[str]":
+        """Return the bookmarks as JSON, None if none are defined anywhere."""
+        if self.explicit_bookmarks is not None:
+            return self.explicit_bookmarks
+        roots = self.roots()
+        with self.lock:
+            if "bookmarks" not in self.memo:
+                self.memo["bookmark_warnings"] = []
+                self.memo["bookmarks"] = bookmark_sources(
+                    self.environ,
+                    roots,
+                    self.magic_files,
+                    self.memo["bookmark_warnings"],
+                )
+            return self.memo["bookmarks"]
+
+    def bookmark_warnings(self) -> "List[str]":
+        """Return warnings about bookmark files which can't be read."""
+        self.bookmarks()
+        return self.memo.get("bookmark_warnings", [])
+
+    def workspace(self, name: str) -> "WorkspaceResolver":
+        """Return a resolver for the root of the registered workspace name."""
+        with self.lock:
+            if name not in self.memo["workspaces"]:
+                # pylint: disable-next=import-outside-toplevel
+                from workspace_bookmark_registry import locate
+
+                try:
+                    root = locate(name, self.environ)
+                except KeyError as exception:
+                    raise WorkspaceRootNotFoundError(
+                        f'Warning: There is no "{name}" workspace in the registry.\n'
+                        "Add the directory it is in to WORKSPACE_BOOKMARK_BASES.\n"
+                    ) from exception
+                workspace = WorkspaceResolver(
+                    root, self.environ, self.explicit_bookmarks, self.magic_files
+                )
+                workspace.probes = self.probes
+                self.memo["workspaces"][name] = workspace
+            return self.memo["workspaces"][name]
+
+    def workspace_name(self, destination: str) -> "Optional[str]":
+        """
+        Return the workspace destination is in, None if it is this one.
+
+        Bookmarks may have a ':' in their name, so a destination starting with
+        one is not split into a workspace and the rest.
+        """
+        name, colon, _ = destination.partition(":")
+        if not colon:
+            return None
+        try:
+            bookmarks = self.bookmarks() or DEFAULT_BOOKMARKS
+        except WorkspaceRootNotFoundError:
+            return name
+        table = bookmark_table(bookmarks, cache_directory(self.environ))
+        return None if destination.partition("/")[0] in table else name
+
+    def resolve(self, destination: str = "") -> str:
+        """
+        Return the absolute path destination refers to.
+
+        A destination is a bookmark, optionally followed by a path to append,
+        e.g. 'build/tmp', and optionally preceded by the name of another
+        workspace, e.g. 'android-13:build'. An empty one is the workspace root.
+        """
+        name = self.workspace_name(destination)
+        if name is not None:
+            return self.workspace(name).resolve(destination.partition(":")[2])
+        # There are many edge cases here but none of them are considered.
+        # 1. Bookmark has a '/' in it's name.
+        # 2. There are two or more bookmarks named "one" and "one/one".
+        # 3. A bookmark is in the path destination_bookmark/path/bookmark/
+        name, separator, path_to_append = destination.partition("/")
+        path_to_append = separator + path_to_append
+        roots = self.roots()
+        bookmarks = self.bookmarks() or DEFAULT_BOOKMARKS
+        if name == "" and path_to_append == "":
+            # When g is called without parameters
+            # $ g
+            # The first parameter $1 is actually ""
+            path = "./"
+        else:
+            try:
+                path, path_to_append = lookup_destination(
+                    name, path_to_append, bookmarks, self.environ, roots
+                )
+            except KeyError as exception:
+                raise BookmarkNotFoundError(
+                    not_bookmarked_warning(name, exception)
+                ) from exception
+        self.probes.phase("bookmark")
+        path = resolve(path, roots, self.magic_files, self.probes)
+        path, path_to_append = expand_globstar(
+            path, path_to_append, self.environ, roots
+        )
+        path_to_append = expand_abbreviations(
+            path, path_to_append, self.environ, self.probes
         )
-        raise BookmarkNotFoundError from exception
+        self.probes.phase("resolve")
+        return path + path_to_append
+
+
+def jump(resolver: WorkspaceResolver, destination: str) -> str:
+    """
+    Return the path of destination like resolver does, warning like g does.
+
+    Unlike resolver, g warns when there are no bookmarks but the workspace root
+    is still found.
+    """
+    workspace = resolver
+    name = resolver.workspace_name(destination)
+    if name is not None:
+        workspace = resolver.workspace(name)
+    if workspace.bookmarks() is None:
+        print(NO_BOOKMARKS_WARNING, file=sys.stderr, end="")
+    for warning in workspace.bookmark_warnings():
+        print(warning, file=sys.stderr, end="")
+    return resolver.resolve(destination)
 
 
-def main(destination: str = ""):
+def get_bookmarked_path(
+    desired_destination: str = "",
+    environ: "Optional[Mapping[str, str]]" = None,
+    cwd: "Optional[str]" = None,
+) -> str:
+    """
+    Return the absolute path desired_destination refers to, printing warnings.
+
+    The environment variables and the current working directory of the caller
+    can be passed explicitly, by default the ones of this process are used.
+    Tools resolving many destinations are better off with a WorkspaceResolver.
+    """
+    resolver = WorkspaceResolver(os.getcwd() if cwd is None else cwd, environ)
+    try:
+        return jump(resolver, desired_destination)
+    except (WorkspaceRootNotFoundError, BookmarkNotFoundError) as exception:
+        print(exception, file=sys.stderr, end="")
+        raise
+
+
+def main(
+    destination: str = "",
+    environ: "Optional[Mapping[str, str]]" = None,
+    cwd: "Optional[str]" = None,
+):
     """Print out commands that after executing them will cd into the right place."""
+    resolver = WorkspaceResolver(os.getcwd() if cwd is None else cwd, environ)
+    status = 0
+    # pylint: disable-next=import-outside-toplevel
+    from workspace_bookmark_history import recall, remember
+
     try:
-        absolute_destination = get_bookmarked_path(destination)
-        print(absolute_destination)
-    except WorkspaceRootNotFoundError:
-        return 1
-    except BookmarkNotFoundError:
-        return 2
-    return 0
+        if destination == "-" or (
+            destination.startswith("@") and destination[1:].isdigit()
+        ):
+            destination = recall(destination, resolver.environ, resolver.roots())
+        # The shell may cd while the jump is remembered.
+        print(jump(resolver, destination), flush=True)
+        try:
+            remember(destination, resolver.environ, resolver.roots())
+        except WorkspaceRootNotFoundError:
+            # Jumps into other workspaces from outside of any aren't remembered.
+            pass
+    except WorkspaceRootNotFoundError as exception:
+        print(exception, file=sys.stderr, end="")
+        status = 1
+    except BookmarkNotFoundError as exception:
+        print(exception, file=sys.stderr, end="")
+        status = 2
+    resolver.probes.finish(destination, status)
+    return status
+
+
+def cli(argv: "List[str]") -> int:
+    """Run main or, if the first argument names one, one of the MODES."""
+    if argv and argv[0] in MODES:
+        return __import__(MODES[argv[0]]).main(argv[1:])
+    return main(*argv)
 
 
 if __name__ == "__main__":
-    sys.exit(main(*(sys.argv[1:])))
+    # Modes import this module by name, make sure they get this very instance.
+    sys.modules.setdefault("workspace_bookmark", sys.modules[__name__])
+    sys.exit(cli(sys.argv[1:]))
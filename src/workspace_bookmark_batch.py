@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Resolve many destinations in a single run, for build scripts.
+
+    workspace_bookmark.py --batch [--null|--json] [DESTINATION...]
+
+Destinations, like 'build' or 'build/tmp/deploy', are taken from the arguments
+or, if there are none, from stdin, one per line or NUL terminated with --null.
+The workspace roots are found once, by a WorkspaceResolver, and every destination
+is resolved from them.
+
+Results are printed in the order of destinations. By default each of them is a
+line 'STATUS<TAB>PATH', with --null the line ends with a NUL instead and with
+--json all of them are a JSON list of objects with destination, status, path and
+warning. STATUS is what the exit code of a single run would be: 0 for success,
+1 if there is no workspace and 2 if the bookmark is missing. Warnings are printed
+to stderr unless they are part of the JSON output.
+
+The exit code is the highest STATUS of all the destinations.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+from contextlib import redirect_stderr
+from typing import Dict, List, Mapping, Optional
+
+import workspace_bookmark
+
+
+def resolve_all(
+    destinations: List[str],
+    environ: Optional[Mapping[str, str]] = None,
+    cwd: Optional[str] = None,
+) -> List[Dict]:
+    """Return the status, path and warning of every destination."""
+    resolver = workspace_bookmark.WorkspaceResolver(
+        os.getcwd() if cwd is None else cwd, environ
+    )
+    results = []
+    for destination in destinations:
+        result = {"destination": destination, "status": 0, "path": ""}
+        with redirect_stderr(io.StringIO()) as warning:
+            try:
+                result["path"] = workspace_bookmark.jump(resolver, destination)
+            except workspace_bookmark.WorkspaceRootNotFoundError as exception:
+                print(exception, file=sys.stderr, end="")
+                result["status"] = 1
+            except workspace_bookmark.BookmarkNotFoundError as exception:
+                print(exception, file=sys.stderr, end="")
+                result["status"] = 2
+        result["warning"] = warning.getvalue()
+        results.append(result)
+    return results
+
+
+def read_destinations(stream: io.TextIOBase, separator: str) -> List[str]:
+    """Return destinations read from stream, each ended by separator."""
+    destinations = stream.read().split(separator)
+    if destinations[-1] == "":
+        destinations.pop()
+    return destinations
+
+
+def main(argv: List[str]) -> int:
+    """Resolve destinations given as arguments or on stdin."""
+    parser = argparse.ArgumentParser(
+        prog="workspace_bookmark.py --batch",
+        description="Resolve many destinations at once.",
+    )
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--null", "-0", action="store_true", help="NUL terminated input and output"
+    )
+    output.add_argument("--json", action="store_true", help="print a JSON list")
+    parser.add_argument("destinations", nargs="*", metavar="DESTINATION")
+    arguments = parser.parse_args(argv)
+
+    separator = "\0" if arguments.null else "\n"
+    destinations = arguments.destinations or read_destinations(sys.stdin, separator)
+    results = resolve_all(destinations)
+    if arguments.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(result["warning"], file=sys.stderr, end="")
+            print(f"{result['status']}\t{result['path']}", end=separator)
+    return max((result["status"] for result in results), default=0)
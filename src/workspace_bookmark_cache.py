@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Persistent caches of workspace_bookmark.
+
+Caches live in WORKSPACE_BOOKMARK_CACHE_DIR, $XDG_CACHE_HOME/workspace-bookmark or
+~/.cache/workspace-bookmark, whichever is found first. Setting
+WORKSPACE_BOOKMARK_CACHE_DIR to an empty string disables caching.
+
+Every cache is only a hint. Entries are validated before they are used so a
+stale or corrupted cache costs time instead of sending g to the wrong place.
+"""
+import json
+import os
+from collections.abc import Mapping
+from functools import lru_cache
+
+# Like in workspace_bookmark, modules which are not needed by every jump are
+# imported where they are used and typing only by type checkers.
+# pylint: disable=import-outside-toplevel
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# The number of directories remembered by RootCache.
+MAX_ROOT_CACHE_ENTRIES = 4096
+# WORKSPACE_BOOKMARKS shorter than that, in characters, is simply parsed.
+BOOKMARK_INDEX_THRESHOLD = 16384
+# The number of different WORKSPACE_BOOKMARKS for which a BookmarkIndex is kept.
+MAX_BOOKMARK_INDEXES = 8
+# Longer names of cache files are not supported by common file systems.
+MAX_NAME = 255
+
+
+def cache_directory(environ: "Optional[Mapping[str, str]]" = None) -> "Optional[str]":
+    """Return the directory caches are stored in or None if caching is disabled."""
+    environ = os.environ if environ is None else environ
+    if "WORKSPACE_BOOKMARK_CACHE_DIR" in environ:
+        return environ["WORKSPACE_BOOKMARK_CACHE_DIR"] or None
+    if environ.get("XDG_CACHE_HOME"):
+        return os.path.join(environ["XDG_CACHE_HOME"], "workspace-bookmark")
+    home = environ.get("HOME") or os.path.expanduser("~")
+    return os.path.join(home, ".cache", "workspace-bookmark")
+
+
+def read_json(path: str, default: "Any") -> "Any":
+    """Return the contents of a JSON cache file or default if it is unusable."""
+    try:
+        with open(path, encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return default
+
+
+def write_text(path: str, text: str):
+    """
+    Atomically replace a cache file.
+
+    Failing to write a cache is not an error, the next call will try again.
+    """
+    import tempfile
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(descriptor, "w", encoding="utf-8") as cache_file:
+            cache_file.write(text)
+        os.replace(temporary_path, path)
+    except OSError:
+        pass
+
+
+def write_json(path: str, data: "Any"):
+    """Atomically replace a JSON cache file."""
+    write_text(path, json.dumps(data, separators=(",", ":")))
+
+
+def forget_oldest_files(directory: str, keep: int):
+    """Remove all but keep most recently modified files in a cache directory."""
+    try:
+        with os.scandir(directory) as entries:
+            files = sorted(entries, key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:-keep]:
+            os.unlink(entry.path)
+    except OSError:
+        pass
+
+
+def escaped_name(text: str, suffix: str) -> "Optional[str]":
+    """
+    Return a name of a cache file for text, or None if it would be too long.
+
+    Unlike digest it doesn't need hashlib, which alone takes a few ms to import,
+    so it suits caches used by every jump.
+    """
+    name = text.replace("%", "%25").replace("/", "%2F") + suffix
+    if len(name.encode("utf-8", "surrogateescape")) > MAX_NAME:
+        return None
+    return name
+
+
+def digest(text: str) -> str:
+    """Return a hash of text suitable as a name of a cache file."""
+    import hashlib
+
+    return hashlib.sha1(text.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+class RootCache:
+    """
+    Map directories to the workspace root discovered from them.
+
+    For every magic file the cache remembers each directory visited while
+    walking up to the root. A later lookup from such a directory costs a single
+    lstat of <root>/<magic_file>. A lookup from a directory below it costs an
+    lstat of the magic file in each directory in between too, so that a nested
+    workspace is not mistaken for the one around it. A magic file created in a
+    cached directory is not noticed until the cache entry is dropped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.roots: "Dict[str, Dict[str, str]]" = read_json(path, {})
+        self.modified = False
+
+    def lookup(self, magic_file: str, directory: str) -> "Optional[str]":
+        """Return the cached and still valid root for directory or None."""
+        roots = self.roots.get(magic_file, {})
+        below = []
+        while directory not in roots:
+            below.append(directory)
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None
+            directory = parent
+        if any(os.path.lexists(os.path.join(path, magic_file)) for path in below):
+            return None
+        root = roots[directory]
+        try:
+            os.lstat(os.path.join(root, magic_file))
+        except OSError:
+            self.evict(magic_file, root)
+            return None
+        return root
+
+    def store(self, magic_file: str, visited: "List[str]", root: str):
+        """Remember that walking up from any of the visited directories finds root."""
+        roots = self.roots.setdefault(magic_file, {})
+        for directory in visited:
+            # Reinsert so that the dict order is the order of discovery.
+            roots.pop(directory, None)
+            roots[directory] = root
+        self.trim()
+        self.modified = True
+
+    def evict(self, magic_file: str, root: str):
+        """Forget every directory which leads to a root that is no longer valid."""
+        roots = self.roots.get(magic_file, {})
+        for directory in [key for key, value in roots.items() if value == root]:
+            del roots[directory]
+        self.modified = True
+
+    def save(self):
+        """Write the cache back to disk if it was modified."""
+        if self.modified:
+            write_json(self.path, self.roots)
+            self.modified = False
+
+    def trim(self):
+        """Drop the oldest entries until the cache fits MAX_ROOT_CACHE_ENTRIES."""
+        excess = sum(len(roots) for roots in self.roots.values())
+        excess -= MAX_ROOT_CACHE_ENTRIES
+        for roots in self.roots.values():
+            for directory in list(roots)[: max(excess, 0)]:
+                del roots[directory]
+                excess -= 1
+
+
+@lru_cache(maxsize=None)
+def root_cache(directory: "Optional[str]") -> "Optional[RootCache]":
+    """Return the RootCache stored in a cache directory, shared within a process."""
+    if directory is None:
+        return None
+    return RootCache(os.path.join(directory, "roots.json"))
+
+
+class BookmarkIndex(Mapping):
+    """
+    Read only view of WORKSPACE_BOOKMARKS stored in a file.
+
+    Every line of the file is a JSON encoded [name, path] pair and the lines are
+    sorted by name. A lookup is a binary search over the memory mapped file so
+    it doesn't have to parse the whole table. A line is identified by its
+    offset in the file.
+    """
+
+    def __init__(self, path: str):
+        import mmap
+
+        with open(path, "rb") as index_file:
+            self.data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def entry(self, start: int) -> "Tuple[str, Any, int]":
+        """Return the name and value of the line at start and where it ends."""
+        end = self.data.find(b"\n", start)
+        name, value = json.loads(self.data[start:end].decode("utf-8"))
+        return name, value, end
+
+    def offset(self, name: str) -> int:
+        """Return the offset of the first line of a name not less than name."""
+        low, high = 0, len(self.data)
+        while low < high:
+            start = self.data.rfind(b"\n", 0, (low + high) // 2) + 1
+            key, _, end = self.entry(start)
+            if key < name:
+                low = end + 1
+            else:
+                high = start
+        return low
+
+    def __getitem__(self, name: str) -> "Any":
+        start = self.offset(name)
+        if start < len(self.data):
+            key, value, _ = self.entry(start)
+            if key == name:
+                return value
+        raise KeyError(name)
+
+    def lines(self, start: int = 0) -> "Iterator[Tuple[int, str]]":
+        """Yield the offset and name of every line from start on."""
+        while start < len(self.data):
+            name, _, end = self.entry(start)
+            yield start, name
+            start = end + 1
+
+    def name_at(self, start: int) -> str:
+        """Return the name of the line at start."""
+        return self.entry(start)[0]
+
+    def prefixed(self, prefix: str) -> "List[str]":
+        """Return names starting with prefix."""
+        names = []
+        for _, name in self.lines(self.offset(prefix)):
+            if not name.startswith(prefix):
+                break
+            names.append(name)
+        return names
+
+    def neighbours(self, name: str, count: int) -> "List[str]":
+        """Return count names around the place name would be sorted in."""
+        start = self.offset(name)
+        for _ in range(count // 2):
+            if start == 0:
+                break
+            start = self.data.rfind(b"\n", 0, start - 1) + 1
+        names = []
+        for _, neighbour in self.lines(start):
+            if len(names) == count:
+                break
+            names.append(neighbour)
+        return names
+
+    def __iter__(self) -> "Iterator[str]":
+        for line in self.data[:].splitlines():
+            yield json.loads(line.decode("utf-8"))[0]
+
+    def __len__(self) -> int:
+        return self.data[:].count(b"\n")
+
+    @staticmethod
+    def write(path: str, bookmarks: "Mapping[str, Any]"):
+        """Store bookmarks in a file which can be opened as a BookmarkIndex."""
+        write_text(
+            path,
+            "".join(
+                json.dumps([name, bookmarks[name]], separators=(",", ":")) + "\n"
+                for name in sorted(bookmarks)
+            ),
+        )
+        # WORKSPACE_BOOKMARKS rarely changes, a few tables are enough.
+        forget_oldest_files(os.path.dirname(path), MAX_BOOKMARK_INDEXES)
+
+
+def bookmark_index_path(bookmarks: str, directory: "Optional[str]") -> "Optional[str]":
+    """Return the path of the BookmarkIndex of WORKSPACE_BOOKMARKS, if it needs one."""
+    if directory is None or len(bookmarks) < BOOKMARK_INDEX_THRESHOLD:
+        return None
+    return os.path.join(directory, "bookmarks", digest(bookmarks) + ".jsonl")
+
+
+@lru_cache(maxsize=8)
+def bookmark_table(bookmarks: str, directory: "Optional[str]") -> "Mapping[str, str]":
+    """
+    Return WORKSPACE_BOOKMARKS as a mapping of names to paths.
+
+    Large tables are stored as a BookmarkIndex named after a hash of
+    WORKSPACE_BOOKMARKS. The next time the same table is used only the hash has
+    to be computed. Within a process the table is kept in memory.
+    """
+    path = bookmark_index_path(bookmarks, directory)
+    if path is None:
+        return json.loads(bookmarks)
+    try:
+        return BookmarkIndex(path)
+    except (OSError, ValueError):
+        parsed = json.loads(bookmarks)
+        BookmarkIndex.write(path, parsed)
+        return parsed
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Shell completion for g.
+
+    workspace_bookmark.py --complete bash|zsh WORD
+
+Prints bookmarks starting with WORD, one per line. Once WORD contains a '/' the
+part after the bookmark is completed with directories below the bookmarked path,
+e.g. 'build/tmp/wo' becomes 'build/tmp/work/'. For zsh bookmarks are printed in
+the 'name:description' format of _describe, with the bookmarked path as the
+description.
+
+Directory listings are cached for LISTING_TTL seconds and as long as the mtime
+of the directory doesn't change, so pressing TAB repeatedly in huge trees like
+out/ or tmp/work lists them only once.
+"""
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stderr
+from typing import List, Mapping, Optional
+
+import workspace_bookmark
+import workspace_bookmark_cache
+
+# Seconds for which a cached directory listing may be used.
+LISTING_TTL = 30
+
+
+def list_directories(path: str, cache: Optional[str] = None) -> List[str]:
+    """Return names of directories in path, through a cache if it is enabled."""
+    if cache is None:
+        return scan_directories(path)
+    cache_path = os.path.join(
+        cache, "listings", workspace_bookmark_cache.digest(path) + ".json"
+    )
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return []
+    listing = workspace_bookmark_cache.read_json(cache_path, {})
+    if (
+        listing.get("path") == path
+        and listing.get("mtime") == mtime
+        and time.time() - listing.get("time", 0) < LISTING_TTL
+    ):
+        return listing["directories"]
+    directories = scan_directories(path)
+    forget_old_listings(os.path.dirname(cache_path))
+    workspace_bookmark_cache.write_json(
+        cache_path,
+        {"path": path, "mtime": mtime, "time": time.time(), "directories": directories},
+    )
+    return directories
+
+
+def forget_old_listings(listings: str):
+    """Remove listings which are too old to be used again."""
+    try:
+        with os.scandir(listings) as entries:
+            for entry in entries:
+                if time.time() - entry.stat().st_mtime > LISTING_TTL:
+                    os.unlink(entry.path)
+    except OSError:
+        pass
+
+
+def scan_directories(path: str) -> List[str]:
+    """Return names of directories in path, without a stat per entry if possible."""
+    try:
+        with os.scandir(path) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir())
+    except OSError:
+        return []
+
+
+def complete_bookmark(word: str, bookmarks: Mapping[str, str]) -> List[str]:
+    """Return bookmarks starting with word."""
+    return sorted(name for name in bookmarks if name.startswith(word))
+
+
+def complete_path(
+    word: str, environ: Mapping[str, str], cwd: Optional[str] = None
+) -> List[str]:
+    """Return 'bookmark/sub/path/' completions of word which contains a '/'."""
+    bookmark, subpath = word.split("/", 1)
+    parent, _, partial = subpath.rpartition("/")
+    try:
+        # Warnings are for the user jumping, not for the one pressing TAB.
+        with redirect_stderr(io.StringIO()):
+            directory = workspace_bookmark.get_bookmarked_path(bookmark, environ, cwd)
+    except (
+        workspace_bookmark.WorkspaceRootNotFoundError,
+        workspace_bookmark.BookmarkNotFoundError,
+    ):
+        return []
+    cache = workspace_bookmark_cache.cache_directory(environ)
+    prefix = bookmark + "/" + (parent + "/" if parent else "")
+    return [
+        prefix + name + "/"
+        for name in list_directories(os.path.join(directory, parent), cache)
+        if name.startswith(partial) and (partial or not name.startswith("."))
+    ]
+
+
+def bookmark_table(
+    environ: Mapping[str, str], cwd: Optional[str] = None
+) -> Mapping[str, str]:
+    """Return bookmarks of the workspace cwd is in, from files and the environment."""
+    cache = workspace_bookmark_cache.cache_directory(environ)
+    magic_files = workspace_bookmark.get_magic_files(environ)
+    roots = workspace_bookmark.find_workspace_roots(
+        magic_files,
+        os.getcwd() if cwd is None else cwd,
+        workspace_bookmark_cache.root_cache(cache),
+    )
+    bookmarks = workspace_bookmark.bookmark_sources(environ, roots, magic_files)
+    return workspace_bookmark_cache.bookmark_table(bookmarks or "{}", cache)
+
+
+def complete(
+    word: str, environ: Optional[Mapping[str, str]] = None, cwd: Optional[str] = None
+) -> List[str]:
+    """Return completions of word."""
+    environ = os.environ if environ is None else environ
+    if "/" in word:
+        return complete_path(word, environ, cwd)
+    return complete_bookmark(word, bookmark_table(environ, cwd))
+
+
+def describe(
+    completions: List[str], environ: Mapping[str, str], cwd: Optional[str] = None
+) -> List[str]:
+    """Format completions for _describe in zsh."""
+    bookmarks = bookmark_table(environ, cwd)
+    return [
+        completion.replace(":", "\\:") + ":" + bookmarks.get(completion, "")
+        for completion in completions
+    ]
+
+
+def main(argv: List[str]) -> int:
+    """Print completions for the shell given as the first argument."""
+    shell, word = (argv + ["", ""])[:2]
+    if shell not in ("bash", "zsh"):
+        print("Usage: workspace_bookmark.py --complete bash|zsh WORD", file=sys.stderr)
+        return 1
+    completions = complete(word)
+    if shell == "zsh":
+        completions = describe(completions, os.environ)
+    for completion in completions:
+        print(completion)
+    return 0
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Bookmarks defined in files instead of the environment.
+
+A large WORKSPACE_BOOKMARKS is copied into the environment of every process the
+shell starts. Bookmarks can instead be kept in JSON files of the same format:
+    WORKSPACE_BOOKMARK_CONFIG - bookmarks of the user, by default
+        $XDG_CONFIG_HOME/workspace-bookmark/bookmarks.json or
+        ~/.config/workspace-bookmark/bookmarks.json
+    ROOT/.workspace-bookmarks.json - bookmarks of a workspace, in any of the
+        roots found, see workspace_bookmark.bookmark_files
+A bookmark of a workspace overrides the one of the user of the same name and
+WORKSPACE_BOOKMARKS, if still set, overrides both.
+
+The merged table is cached along with the modification times of the files and
+WORKSPACE_BOOKMARKS, so the files are parsed again only once one of them
+changes.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import workspace_bookmark_cache
+
+# The number of different sets of files for which a merged table is kept.
+MAX_MERGED_TABLES = 64
+
+
+def read_bookmarks(path: str) -> Dict[str, str]:
+    """
+    Return bookmarks defined in a file.
+
+    ValueError is raised, with the warning g prints, if the file is bad.
+    """
+    try:
+        with open(path, encoding="utf-8") as bookmark_file:
+            bookmarks = json.load(bookmark_file)
+    except (OSError, ValueError) as error:
+        raise ValueError(
+            f"Warning: Can't read bookmarks from {path}: {error}\n"
+        ) from error
+    if not isinstance(bookmarks, dict) or not all(
+        isinstance(value, str) for value in bookmarks.values()
+    ):
+        raise ValueError(
+            f"Warning: Can't read bookmarks from {path}: "
+            "it is not an object of names and paths\n"
+        )
+    return bookmarks
+
+
+@lru_cache(maxsize=8)
+def merge_bookmarks(
+    files: Tuple[Tuple[str, int], ...], variable: Optional[str], cache: Optional[str]
+) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Return bookmarks of files, least important first, and variable as JSON.
+
+    files are paths along with their modification times. Warnings about files
+    which can't be read are returned along with the bookmarks of the others.
+    Within a process the result is kept in memory, like bookmark_table does with
+    the table itself.
+    """
+    state = {"files": [list(file) for file in files], "variable": variable}
+    cache_path = None
+    if cache is not None:
+        # Files whose names are joined the same are told apart by state.
+        paths = ":".join(path for path, _ in files)
+        name = workspace_bookmark_cache.escaped_name(paths, ".json")
+        if name is None:
+            name = workspace_bookmark_cache.digest(paths) + ".json"
+        cache_path = os.path.join(cache, "config", name)
+        cached = workspace_bookmark_cache.read_json(cache_path, {})
+        if all(cached.get(key) == value for key, value in state.items()):
+            return cached["bookmarks"], ()
+    merged: Dict[str, str] = {}
+    warnings = []
+    for path, _ in files:
+        try:
+            merged.update(read_bookmarks(path))
+        except ValueError as error:
+            warnings.append(str(error))
+    if variable is not None:
+        merged.update(json.loads(variable))
+    text = json.dumps(merged)
+    # A bad file isn't cached so that its warning is shown until it is fixed.
+    if cache_path is not None and not warnings:
+        workspace_bookmark_cache.write_json(cache_path, dict(state, bookmarks=text))
+        workspace_bookmark_cache.forget_oldest_files(
+            os.path.dirname(cache_path), MAX_MERGED_TABLES
+        )
+    return text, tuple(warnings)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Resolver daemon for g.
+
+Most of the time spent by g goes into starting the interpreter. The daemon keeps
+one interpreter per user alive and answers get_bookmarked_path requests over a
+Unix socket. setup.sh talks to it with socat and falls back to running
+workspace_bookmark.py when the daemon is not running.
+
+Start it with:
+    workspace_bookmark.py --daemon
+
+A request is a list of NUL terminated fields: the current working directory,
+the destination and any number of NAME=VALUE environment variables, the
+WORKSPACE_BOOKMARK* ones and those in FORWARDED. The
+destination '--prompt' asks for the prompt segment of workspace_bookmark_prompt.
+A response is a list of NUL terminated fields: the exit code, stdout and stderr.
+
+Requests carry the current directory and environment and responses tell g where
+to go, so both ends only use a socket owned by the user. Without
+XDG_RUNTIME_DIR the socket is put into a directory in /tmp which only the user
+may access.
+"""
+import io
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Callable, List, Mapping, Optional, Tuple
+
+import workspace_bookmark
+import workspace_bookmark_trace
+from workspace_bookmark_prompt import prompt
+
+ENCODING = "utf-8"
+# Variables besides WORKSPACE_BOOKMARK* which tell where the bookmark files and
+# caches of the caller are. Keep in sync with _g_daemon in setup.sh.
+FORWARDED = ("HOME", "XDG_CACHE_HOME", "XDG_CONFIG_HOME")
+
+
+def socket_path(environ: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Return the path of the socket the daemon listens on.
+
+    Keep in sync with _g_socket in setup.sh.
+    """
+    environ = os.environ if environ is None else environ
+    if "WORKSPACE_BOOKMARK_SOCKET" in environ:
+        return environ["WORKSPACE_BOOKMARK_SOCKET"]
+    if "XDG_RUNTIME_DIR" in environ:
+        return os.path.join(environ["XDG_RUNTIME_DIR"], "workspace-bookmark.sock")
+    return f"/tmp/workspace-bookmark-{os.getuid()}/daemon.sock"
+
+
+def is_private(path: str, is_kind: Callable[[int], bool] = stat.S_ISSOCK) -> bool:
+    """Tell whether path is of a kind, owned by the user and not writable by others."""
+    try:
+        status = os.lstat(path)
+    except OSError:
+        return False
+    return (
+        is_kind(status.st_mode)
+        and status.st_uid == os.getuid()
+        and not status.st_mode & 0o022
+    )
+
+
+def prepare_directory(path: str) -> Optional[str]:
+    """
+    Return a warning if the directory of the socket is unsafe to listen in.
+
+    The directory in /tmp of the default socket is created if it is missing and
+    must be private, since another user could create it first.
+    """
+    directory = os.path.dirname(path)
+    if path != socket_path({}):
+        return None
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    except OSError as error:
+        return f"Warning: Can't create {directory}: {error}"
+    if not is_private(directory, stat.S_ISDIR):
+        return f"Warning: {directory} is not a private directory of yours."
+    return None
+
+
+def encode(fields: List[str]) -> bytes:
+    """Join fields into a message."""
+    return b"".join(
+        field.encode(ENCODING, "surrogateescape") + b"\0" for field in fields
+    )
+
+
+def decode(message: bytes) -> List[str]:
+    """Split a message into fields."""
+    return message.decode(ENCODING, "surrogateescape").split("\0")[:-1]
+
+
+def answer(request: bytes) -> bytes:
+    """Resolve a request exactly like a one-shot run of workspace_bookmark.py."""
+    workspace_bookmark_trace.request_received()
+    cwd, destination, *variables = decode(request)
+    environ = dict(variable.split("=", 1) for variable in variables)
+    if destination == "--prompt":
+        return encode(["0", prompt(environ, os.path.realpath(cwd)), ""])
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        exit_code = workspace_bookmark.main(destination, environ, os.path.realpath(cwd))
+    return encode([str(exit_code), stdout.getvalue(), stderr.getvalue()])
+
+
+class ResolverHandler(socketserver.StreamRequestHandler):
+    """Answer a single request, the client signals its end by shutting down."""
+
+    def handle(self):
+        request = self.rfile.read()
+        # is_listening connects without sending anything.
+        if request:
+            self.wfile.write(answer(request))
+
+
+def is_listening(path: str) -> bool:
+    """Check if a daemon already answers on the socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(path: str) -> int:
+    """Answer requests until terminated."""
+    if is_listening(path):
+        print(f"Warning: A daemon is already listening on {path}.", file=sys.stderr)
+        return 1
+    warning = prepare_directory(path)
+    if warning is not None:
+        print(warning, file=sys.stderr)
+        return 1
+    if os.path.lexists(path):
+        if not is_private(path):
+            print(f"Warning: {path} is not a socket of yours.", file=sys.stderr)
+            return 1
+        os.unlink(path)
+    # The socket must not be connectable by other users.
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(path, ResolverHandler)
+    finally:
+        os.umask(old_umask)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+    return 0
+
+
+def query(
+    path: str, destination: str, environ: Mapping[str, str], cwd: str
+) -> Tuple[int, str, str]:
+    """Ask the daemon to resolve a destination, like g does through socat."""
+    variables = [
+        f"{name}={value}"
+        for name, value in environ.items()
+        if name.startswith("WORKSPACE_BOOKMARK") or name in FORWARDED
+    ]
+    if not is_private(path):
+        raise PermissionError(f"{path} is not a socket of yours")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall(encode([cwd, destination] + variables))
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile("rb") as response:
+            exit_code, stdout, stderr = decode(response.read())
+    return int(exit_code), stdout, stderr
+
+
+def main(argv: List[str]) -> int:
+    """Serve on the socket given as the only argument or on the default one."""
+    return serve(argv[0] if argv else socket_path())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Check every bookmark in every workspace, to find the ones which went stale.
+
+    workspace_bookmark.py --doctor [DIRECTORY...]
+
+Checks the workspaces below the directories, found like --scan finds them, or
+the current workspace if none are given. Every candidate of a bookmark, i.e.
+every variant of its optional segments in the root of every magic file, is
+checked by a pool of WORKSPACE_BOOKMARK_SCAN_THREADS threads.
+
+Prints a tab separated matrix with a row per bookmark and a column per
+workspace. A cell is the tier the bookmark resolves to in the workspace, the
+number of candidates before the first existing one, '-' if it is broken, i.e.
+no candidate exists, or '.' if the workspace doesn't define the bookmark.
+
+The exit code is 2 if a bookmark is broken in every workspace defining it.
+"""
+import argparse
+import itertools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import workspace_bookmark
+import workspace_bookmark_registry
+
+
+def candidates(path: str, roots: Dict[str, str], magic_files: List[str]) -> List[str]:
+    """Return every candidate of a bookmarked path in order of preference."""
+    variants = [
+        workspace_bookmark.join_variant(parts)
+        for parts in itertools.product(*workspace_bookmark.compile_pattern(path))
+    ]
+    return [
+        os.path.join(roots[magic_file], variant)
+        for magic_file in magic_files
+        if magic_file in roots
+        for variant in variants
+    ]
+
+
+def tier(paths: List[str]) -> Optional[int]:
+    """Return the index of the first directory among paths or None."""
+    return next(
+        (number for number, path in enumerate(paths) if os.path.isdir(path)), None
+    )
+
+
+def find_workspaces(
+    directories: List[str], environ: Mapping[str, str]
+) -> Dict[str, str]:
+    """Return workspace roots below directories, or of the current one, by name."""
+    if directories:
+        return workspace_bookmark_registry.workspaces_below(directories, environ)
+    roots = workspace_bookmark.find_workspace_roots(
+        workspace_bookmark.get_magic_files(environ), os.getcwd()
+    )
+    return workspace_bookmark_registry.name_workspaces(sorted(set(roots.values())))
+
+
+def diagnose(
+    workspaces: Dict[str, str],
+    environ: Mapping[str, str],
+    warnings: Optional[List[str]] = None,
+) -> Dict[Tuple[str, str], Optional[int]]:
+    """
+    Return the tier of every bookmark of every workspace, by both names.
+
+    Warnings about bookmark files which can't be read are added to warnings.
+    """
+    magic_files = workspace_bookmark.get_magic_files(environ)
+    checks = {}
+    for name, root in workspaces.items():
+        roots = workspace_bookmark.find_workspace_roots(magic_files, root)
+        bookmarks = workspace_bookmark.load_bookmarks(
+            workspace_bookmark.bookmark_sources(environ, roots, magic_files, warnings)
+            or "{}"
+        )
+        for bookmark, path in bookmarks.items():
+            checks[bookmark, name] = candidates(path, roots, magic_files)
+    threads = int(
+        environ.get(
+            "WORKSPACE_BOOKMARK_SCAN_THREADS", workspace_bookmark_registry.SCAN_THREADS
+        )
+    )
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as pool:
+        return dict(zip(checks, pool.map(tier, checks.values())))
+
+
+def format_matrix(
+    workspaces: List[str], tiers: Dict[Tuple[str, str], Optional[int]]
+) -> List[str]:
+    """Return lines of the matrix of bookmarks and workspaces."""
+    lines = ["\t".join(["bookmark"] + workspaces)]
+    for bookmark in sorted({bookmark for bookmark, _ in tiers}):
+        cells = [bookmark]
+        for workspace in workspaces:
+            if (bookmark, workspace) not in tiers:
+                cells.append(".")
+            elif tiers[bookmark, workspace] is None:
+                cells.append("-")
+            else:
+                cells.append(str(tiers[bookmark, workspace]))
+        lines.append("\t".join(cells))
+    return lines
+
+
+def main(argv: List[str]) -> int:
+    """Print the matrix for the workspaces below the given directories."""
+    parser = argparse.ArgumentParser(
+        prog="workspace_bookmark.py --doctor",
+        description="Check every bookmark in every workspace.",
+    )
+    parser.add_argument("directories", nargs="*", metavar="DIRECTORY")
+    arguments = parser.parse_args(argv)
+
+    workspaces = find_workspaces(arguments.directories, os.environ)
+    if not workspaces:
+        print("Warning: There are no workspaces to check.", file=sys.stderr)
+        return 1
+    warnings: List[str] = []
+    tiers = diagnose(workspaces, os.environ, warnings)
+    for warning in dict.fromkeys(warnings):
+        print(warning, file=sys.stderr, end="")
+    for line in format_matrix(sorted(workspaces), tiers):
+        print(line)
+    resolves: Dict[str, bool] = {}
+    for (bookmark, _), number in tiers.items():
+        resolves[bookmark] = resolves.get(bookmark, False) or number is not None
+    broken = sorted(bookmark for bookmark, resolved in resolves.items() if not resolved)
+    if broken:
+        print(
+            "Warning: Broken in every workspace: " + ", ".join(broken),
+            file=sys.stderr,
+        )
+        return 2
+    return 0
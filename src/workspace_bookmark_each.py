@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Run a command in a bookmarked directory of every workspace.
+
+    workspace_bookmark.py --each [--under DIRECTORY]... [--jobs N] BOOKMARK --
+        COMMAND [ARGUMENT...]
+
+Runs COMMAND in the directory BOOKMARK resolves to, with the same preferred and
+backup rules as g, in every workspace below the directories, found like --scan
+finds them, or below WORKSPACE_BOOKMARK_BASES if none are given. Unlike g it
+never takes BOOKMARK, or the path after it, for an abbreviation. At most N
+commands run at once, WORKSPACE_BOOKMARK_SCAN_THREADS by default.
+
+Every line a command writes to stdout or stderr is printed as soon as it is
+written, prefixed with the name of its workspace. Workspaces in which the
+bookmark doesn't resolve to an existing directory are skipped with a warning
+and count as status 2, commands which can't be started as status 127. The exit
+code is the highest status and the workspaces with another status than 0 are
+listed on stderr.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import Dict, List, Mapping, Tuple
+
+import workspace_bookmark
+import workspace_bookmark_registry
+
+# The longest line of output printed, longer ones are left out.
+MAX_LINE = 1 << 20
+
+
+def find_targets(
+    bookmark: str, workspaces: Dict[str, str], environ: Mapping[str, str]
+) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """Return the directories to run in and the statuses of skipped workspaces."""
+    targets = {}
+    statuses = {}
+    # An abbreviation could pick another directory in each workspace.
+    environ = dict(environ, WORKSPACE_BOOKMARK_MATCH="exact")
+    for name, root in sorted(workspaces.items()):
+        resolver = workspace_bookmark.WorkspaceResolver(root, environ)
+        try:
+            path = resolver.resolve(bookmark)
+            for warning in resolver.bookmark_warnings():
+                print(f"{name}: {warning}", file=sys.stderr, end="")
+        except (
+            workspace_bookmark.WorkspaceRootNotFoundError,
+            workspace_bookmark.BookmarkNotFoundError,
+        ) as exception:
+            print(f"{name}: {exception}", file=sys.stderr, end="")
+            statuses[name] = 2
+            continue
+        if not os.path.isdir(path):
+            print(f"{name}: Warning: {path} doesn't exist.", file=sys.stderr)
+            statuses[name] = 2
+            continue
+        targets[name] = path
+    return targets, statuses
+
+
+async def run(
+    name: str, path: str, command: List[str], slots: asyncio.Semaphore
+) -> int:
+    """Run command in path once a slot is free, printing its prefixed output."""
+    async with slots:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=path,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=MAX_LINE,
+            )
+        except OSError as error:
+            print(f"{name}: {error}", file=sys.stderr, flush=True)
+            return 127
+        while True:
+            try:
+                line = await process.stdout.readline()
+            except ValueError:
+                print(f"{name}: [line longer than {MAX_LINE} bytes]", flush=True)
+                continue
+            if not line:
+                break
+            text = line.decode("utf-8", "replace")
+            print(f"{name}: {text.rstrip(chr(10))}", flush=True)
+        status = await process.wait()
+        # Like the shell, report commands killed by a signal as 128 + signal.
+        return 128 - status if status < 0 else status
+
+
+async def run_all(targets: Dict[str, str], command: List[str], jobs: int) -> List[int]:
+    """Run command in every target directory, at most jobs at once."""
+    slots = asyncio.Semaphore(jobs)
+    return await asyncio.gather(
+        *(run(name, path, command, slots) for name, path in targets.items())
+    )
+
+
+def each(targets: Dict[str, str], command: List[str], jobs: int) -> Dict[str, int]:
+    """Return the status of command run in every target directory by name."""
+    # asyncio.run is missing in Python 3.6. Child processes are only watched
+    # for the event loop of the main thread before Python 3.8.
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        statuses = loop.run_until_complete(run_all(targets, command, max(jobs, 1)))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    return dict(zip(targets, statuses))
+
+
+def main(argv: List[str]) -> int:
+    """Run the command in the bookmarked directory of every workspace."""
+    parser = argparse.ArgumentParser(
+        prog="workspace_bookmark.py --each",
+        usage="%(prog)s [--under DIRECTORY]... [--jobs N] BOOKMARK -- COMMAND...",
+        description="Run a command in a bookmarked directory of every workspace.",
+    )
+    parser.add_argument(
+        "--under",
+        action="append",
+        default=[],
+        metavar="DIRECTORY",
+        help="find workspaces below DIRECTORY instead of WORKSPACE_BOOKMARK_BASES",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        default=int(
+            os.environ.get(
+                "WORKSPACE_BOOKMARK_SCAN_THREADS",
+                workspace_bookmark_registry.SCAN_THREADS,
+            )
+        ),
+        help="run at most N commands at once",
+    )
+    parser.add_argument("bookmark", metavar="BOOKMARK")
+    split = argv.index("--") if "--" in argv else len(argv)
+    arguments = parser.parse_args(argv[:split])
+    command = argv[split:][1:]
+    if not command:
+        parser.error("a command is needed after --")
+
+    directories = arguments.under or workspace_bookmark_registry.get_bases(os.environ)
+    workspaces = workspace_bookmark_registry.workspaces_below(directories, os.environ)
+    if not workspaces:
+        print("Warning: There are no workspaces to run in.", file=sys.stderr)
+        return 1
+    targets, statuses = find_targets(arguments.bookmark, workspaces, os.environ)
+    statuses.update(each(targets, command, arguments.jobs))
+    failed = sorted(name for name, status in statuses.items() if status)
+    if failed:
+        print(
+            "Warning: Failed in "
+            + ", ".join(f"{name} ({statuses[name]})" for name in failed),
+            file=sys.stderr,
+        )
+    return max(statuses.values())
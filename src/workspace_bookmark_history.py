@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+History of jumps, kept per workspace.
+
+Every successful jump is remembered in the workspace it was made from, so that
+it can be repeated:
+    g -  - goto the destination of the jump before the last one
+    g @N - goto the destination of the Nth most recent jump, @0 being the last
+
+    workspace_bookmark.py --history
+
+Lists the most recent jumps of the current workspace.
+
+The history of a workspace is a ring of HISTORY_SLOTS fixed-size slots in a
+memory mapped file among the caches. Remembering a jump writes a single slot
+and a counter, under a lock so that concurrent shells don't overwrite each
+other, and the file never grows. The jump is remembered once its path is
+printed, so the shell doesn't wait for that.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import sys
+import time
+
+import workspace_bookmark
+import workspace_bookmark_cache
+
+# Like in workspace_bookmark, typing is only imported by type checkers since
+# every jump imports this module.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, List, Mapping, Optional, Tuple
+
+# The number of jumps remembered per workspace.
+HISTORY_SLOTS = 128
+# The number of jumps ever remembered, the next slot to write is that modulo
+# HISTORY_SLOTS.
+HEADER = struct.Struct("<Q")
+# When a jump was made and its destination, NUL padded. Longer destinations are
+# not remembered.
+MAX_DESTINATION = 248
+SLOT = struct.Struct(f"<d{MAX_DESTINATION}s")
+HISTORY_SIZE = HEADER.size + HISTORY_SLOTS * SLOT.size
+
+
+def history_path(
+    environ: "Mapping[str, str]", roots: "Dict[str, str]"
+) -> "Optional[str]":
+    """Return the path of the history of the workspace with roots, if it has one."""
+    cache = workspace_bookmark_cache.cache_directory(environ)
+    if cache is None:
+        return None
+    for magic_file in workspace_bookmark.get_magic_files(environ):
+        if magic_file in roots:
+            name = workspace_bookmark_cache.escaped_name(roots[magic_file], ".ring")
+            return None if name is None else os.path.join(cache, "history", name)
+    return None
+
+
+def read_ring(ring: mmap.mmap) -> "List[Tuple[float, str]]":
+    """Return jumps in a ring, the most recent first."""
+    (count,) = HEADER.unpack_from(ring, 0)
+    jumps = []
+    for number in range(count - 1, max(count - HISTORY_SLOTS, 0) - 1, -1):
+        when, destination = SLOT.unpack_from(
+            ring, HEADER.size + number % HISTORY_SLOTS * SLOT.size
+        )
+        jumps.append((when, destination.rstrip(b"\0").decode("utf-8", "replace")))
+    return jumps
+
+
+def read_history(path: str) -> "List[Tuple[float, str]]":
+    """Return jumps of a history, the most recent first."""
+    try:
+        descriptor = os.open(path, os.O_RDONLY)
+    except OSError:
+        return []
+    try:
+        fcntl.flock(descriptor, fcntl.LOCK_SH)
+        if os.fstat(descriptor).st_size != HISTORY_SIZE:
+            return []
+        with mmap.mmap(descriptor, HISTORY_SIZE, access=mmap.ACCESS_READ) as ring:
+            return read_ring(ring)
+    finally:
+        os.close(descriptor)
+
+
+def remember(destination: str, environ: "Mapping[str, str]", roots: "Dict[str, str]"):
+    """Add a jump to destination to the history, unless it was the last one."""
+    encoded = destination.encode("utf-8", "surrogateescape")
+    path = history_path(environ, roots)
+    if path is None or len(encoded) > MAX_DESTINATION:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        return
+    try:
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+        if os.fstat(descriptor).st_size != HISTORY_SIZE:
+            # A new or damaged history starts from scratch.
+            os.ftruncate(descriptor, 0)
+            os.ftruncate(descriptor, HISTORY_SIZE)
+        with mmap.mmap(descriptor, HISTORY_SIZE) as ring:
+            (count,) = HEADER.unpack_from(ring, 0)
+            if count and read_ring(ring)[0][1] == destination:
+                return
+            offset = HEADER.size + count % HISTORY_SLOTS * SLOT.size
+            SLOT.pack_into(ring, offset, time.time(), encoded)
+            HEADER.pack_into(ring, 0, count + 1)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def recall(
+    reference: str, environ: "Mapping[str, str]", roots: "Dict[str, str]"
+) -> str:
+    """
+    Return the destination of the jump '-' or '@N' refers to.
+
+    BookmarkNotFoundError is raised if the history isn't that long.
+    """
+    number = 1 if reference == "-" else int(reference[1:])
+    path = history_path(environ, roots)
+    jumps = [] if path is None else read_history(path)
+    if number >= len(jumps):
+        raise workspace_bookmark.BookmarkNotFoundError(
+            f"Warning: There is no {reference} in the history of this workspace.\n"
+        )
+    return jumps[number][1]
+
+
+def main(argv: "List[str]") -> int:
+    """List the most recent jumps made in the current workspace."""
+    if argv:
+        print("Usage: workspace_bookmark.py --history", file=sys.stderr)
+        return 1
+    roots = workspace_bookmark.find_workspace_roots(
+        workspace_bookmark.get_magic_files(os.environ),
+        os.getcwd(),
+        workspace_bookmark_cache.root_cache(
+            workspace_bookmark_cache.cache_directory(os.environ)
+        ),
+    )
+    path = history_path(os.environ, roots)
+    for number, (when, destination) in enumerate(
+        [] if path is None else read_history(path)
+    ):
+        print(
+            f"@{number}\t{time.strftime('%F %T', time.localtime(when))}\t{destination}"
+        )
+    return 0
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Index of the directories of a workspace, for jumps to a directory by its name.
+
+With WORKSPACE_BOOKMARK_INDEX=1 a '**' part of a destination matches any number
+of directories, like in a glob:
+    g build/**/recipes-core - goto the shallowest recipes-core below poky/build
+    g **/vendor-name        - goto the shallowest vendor-name in the workspace
+Other parts may contain '*' and '?'. Of several matches the one with the fewest
+parts wins, then the one sorting first.
+
+Matches are looked up in an index of every directory of the workspace, like the
+one of locate: a sorted file among the caches with a line per directory, its
+path relative to the workspace root and its mtime. Directories named in
+WORKSPACE_BOOKMARK_INDEX_SKIP, a ':' separated list, are left out along with
+everything below them, by default INDEX_SKIP.
+
+    workspace_bookmark.py --index
+
+Updates the index of the current workspace, e.g. from cron. An update lists only
+the directories whose mtime changed since the last one and takes the rest from
+the index. A jump updates the index itself if there is none yet or if the
+directory it found is gone. When none is found the index is updated only if it
+is stale: older than INDEX_MAX_AGE seconds, or the directory the search starts
+from or a directory named in the pattern before its first wildcard changed
+since. A mistyped name thus doesn't stat every directory of the workspace again.
+"""
+import mmap
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Mapping, Optional, Pattern, Tuple
+
+import workspace_bookmark
+import workspace_bookmark_cache
+
+# Default of WORKSPACE_BOOKMARK_INDEX_SKIP, build output and version control
+# metadata which are huge and not worth jumping into by name.
+INDEX_SKIP = "out:.git:.repo:tmp"
+# The number of workspaces for which an index is kept.
+MAX_DIRECTORY_INDEXES = 16
+# Seconds after which a search finding nothing updates the index.
+INDEX_MAX_AGE = 300
+
+
+def encode(path: str) -> bytes:
+    """Return path as it is written to an index."""
+    return path.encode("utf-8", "surrogateescape")
+
+
+def index_path(root: str, cache: str) -> str:
+    """Return the path of the index of the workspace root."""
+    return os.path.join(
+        cache, "directories", workspace_bookmark_cache.digest(root) + ".idx"
+    )
+
+
+def read_index(path: str) -> Dict[str, int]:
+    """Return mtimes of directories in an index, by their path."""
+    directories = {}
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as index:
+            for line in index:
+                directory, _, mtime = line.rstrip("\n").rpartition("\t")
+                directories[directory] = int(mtime)
+    except (OSError, ValueError):
+        return {}
+    return directories
+
+
+def list_subdirectories(root: str, directory: str, skip: List[str]) -> List[str]:
+    """Return paths of subdirectories of directory relative to root."""
+    try:
+        with os.scandir(os.path.join(root, directory)) as entries:
+            return [
+                os.path.join(directory, entry.name)
+                for entry in entries
+                if entry.name not in skip
+                and "\t" not in entry.name
+                and "\n" not in entry.name
+                and entry.is_dir(follow_symlinks=False)
+            ]
+    except OSError:
+        return []
+
+
+def update(root: str, environ: Mapping[str, str], cache: str) -> int:
+    """Update the index of the workspace root and return its number of entries."""
+    path = index_path(root, cache)
+    skip = environ.get("WORKSPACE_BOOKMARK_INDEX_SKIP", INDEX_SKIP).split(":")
+    previous = read_index(path)
+    subdirectories: Dict[str, List[str]] = {}
+    for directory in previous:
+        if directory:
+            parent = directory.rpartition("/")[0]
+            subdirectories.setdefault(parent, []).append(directory)
+    directories = {}
+    pending = [""]
+    while pending:
+        directory = pending.pop()
+        try:
+            mtime = os.stat(os.path.join(root, directory)).st_mtime_ns
+        except OSError:
+            continue
+        directories[directory] = mtime
+        # Only adding, removing or renaming entries changes the mtime.
+        if previous.get(directory) == mtime:
+            pending.extend(subdirectories.get(directory, []))
+        else:
+            pending.extend(list_subdirectories(root, directory, skip))
+    workspace_bookmark_cache.write_text(
+        path,
+        "".join(
+            f"{directory}\t{directories[directory]}\n"
+            # Sorted by bytes, like the index is searched.
+            for directory in sorted(directories, key=encode)
+        ),
+    )
+    workspace_bookmark_cache.forget_oldest_files(
+        os.path.dirname(path), MAX_DIRECTORY_INDEXES
+    )
+    return len(directories)
+
+
+def compile_glob(start: str, pattern: str) -> Pattern[bytes]:
+    """Return a regular expression matching lines of directories pattern matches."""
+    parts = []
+    for part in pattern.strip("/").split("/"):
+        if part == "**":
+            parts.append("(?:[^\t\n]*/)?")
+        elif part:
+            part = re.escape(part).replace("\\*", "[^/\t\n]*")
+            parts.append(part.replace("\\?", "[^/\t\n]") + "/")
+    prefix = re.escape(start + "/") if start else ""
+    regex = "^" + prefix + "".join(parts)
+    # A pattern ending with '**' matches nothing but its start.
+    regex = regex[:-1] if regex.endswith("/") else regex + "(?!)"
+    return re.compile(encode(regex + "\t"), re.MULTILINE)
+
+
+def line_offset(lines: mmap.mmap, key: bytes) -> int:
+    """Return the offset of the first line of the index not less than key."""
+    low, high = 0, len(lines)
+    while low < high:
+        start = lines.rfind(b"\n", 0, (low + high) // 2) + 1
+        end = lines.find(b"\n", start)
+        end = len(lines) if end < 0 else end
+        if lines[start:end].rpartition(b"\t")[0] < key:
+            low = end + 1
+        else:
+            high = start
+    return low
+
+
+def prefix_range(lines: mmap.mmap, prefix: bytes) -> Tuple[int, int]:
+    """Return the offsets of the lines of directories starting with prefix."""
+    following = prefix.rstrip(b"\xff")
+    if not following:
+        return line_offset(lines, prefix), len(lines)
+    following = following[:-1] + bytes([following[-1] + 1])
+    return line_offset(lines, prefix), line_offset(lines, following)
+
+
+def literal_directories(relative: str, pattern: str) -> List[str]:
+    """Return relative and the directories below it pattern names literally."""
+    directories = [relative]
+    for part in pattern.strip("/").split("/")[:-1]:
+        if "*" in part or "?" in part:
+            break
+        directories.append(os.path.join(directories[-1], part))
+    return directories
+
+
+def relative_start(root: str, start: str) -> str:
+    """Return the path of start relative to root, as written to the index."""
+    relative = os.path.relpath(start, root)
+    return "" if relative == "." else relative
+
+
+def search(root: str, start: str, pattern: str, cache: str) -> Optional[str]:
+    """Return the best directory below start matching pattern in the index."""
+    relative = relative_start(root, start)
+    regex = compile_glob(relative, pattern)
+    # Only the lines of the directories named before the first wildcard match.
+    prefix = os.path.join(relative, pattern.strip("/"))
+    prefix = re.split(r"[*?]", prefix)[0].rstrip("/")
+    try:
+        with open(index_path(root, cache), "rb") as index, mmap.mmap(
+            index.fileno(), 0, access=mmap.ACCESS_READ
+        ) as lines:
+            low, high = prefix_range(lines, encode(prefix))
+            matches = [match.group()[:-1] for match in regex.finditer(lines, low, high)]
+    except (OSError, ValueError):
+        return None
+    if not matches:
+        return None
+    best = min(matches, key=lambda match: (match.count(b"/"), match))
+    return os.path.join(root, best.decode("utf-8", "surrogateescape"))
+
+
+def workspace_root(path: str, roots: Dict[str, str]) -> str:
+    """Return the innermost of roots path is in, or path itself if none."""
+    containing = [
+        os.path.abspath(root)
+        for root in roots.values()
+        if (path + "/").startswith(os.path.abspath(root).rstrip("/") + "/")
+    ]
+    return max(containing, key=len, default=path)
+
+
+def stale(root: str, start: str, pattern: str, cache: str) -> bool:
+    """Tell whether directories pattern could match may be missing in the index."""
+    path = index_path(root, cache)
+    try:
+        if time.time() - os.stat(path).st_mtime > INDEX_MAX_AGE:
+            return True
+        with open(path, "rb") as index, mmap.mmap(
+            index.fileno(), 0, access=mmap.ACCESS_READ
+        ) as lines:
+            for directory in literal_directories(relative_start(root, start), pattern):
+                key = encode(directory)
+                lines.seek(line_offset(lines, key))
+                indexed, _, mtime = lines.readline().rstrip(b"\n").partition(b"\t")
+                if indexed != key:
+                    return os.path.isdir(os.path.join(root, directory))
+                if int(mtime) != os.stat(os.path.join(root, directory)).st_mtime_ns:
+                    return True
+    except (OSError, ValueError):
+        return True
+    return False
+
+
+def find(
+    start: str, pattern: str, environ: Mapping[str, str], roots: Dict[str, str]
+) -> str:
+    """
+    Return the best directory below start matching pattern.
+
+    BookmarkNotFoundError is raised if there is none.
+    """
+    cache = workspace_bookmark_cache.cache_directory(environ)
+    if cache is None:
+        raise workspace_bookmark.BookmarkNotFoundError(
+            "Warning: The directory index is kept among caches, which are disabled.\n"
+        )
+    root = workspace_root(start, roots)
+    found = search(root, start, pattern, cache)
+    if found is None:
+        outdated = stale(root, start, pattern, cache)
+    else:
+        outdated = not os.path.isdir(found)
+    if outdated:
+        update(root, environ, cache)
+        found = search(root, start, pattern, cache)
+    if found is None:
+        raise workspace_bookmark.BookmarkNotFoundError(
+            f"Warning: There is no {pattern.strip('/')} below {start}.\n"
+        )
+    return found
+
+
+def main(argv: List[str]) -> int:
+    """Update the index of the workspace of the current directory."""
+    if argv:
+        print("Usage: workspace_bookmark.py --index", file=sys.stderr)
+        return 1
+    cache = workspace_bookmark_cache.cache_directory()
+    if cache is None:
+        print(
+            "Warning: The directory index is kept among caches, which are disabled.",
+            file=sys.stderr,
+        )
+        return 1
+    magic_files = workspace_bookmark.get_magic_files(os.environ)
+    roots = workspace_bookmark.find_workspace_roots(
+        magic_files, os.getcwd(), workspace_bookmark_cache.root_cache(cache)
+    )
+    for root in sorted(set(map(os.path.abspath, roots.values()))):
+        print(f"{update(root, os.environ, cache)} directories in {root}")
+    return 0
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+List bookmarks along with where they lead, for pickers like fzf.
+
+    workspace_bookmark.py --list
+
+Prints a line 'NAME<TAB>PATH<TAB>exists|missing' per bookmark of the current
+workspace, PATH being where g would go. The workspace is found once and the
+bookmarks are resolved by a pool of WORKSPACE_BOOKMARK_SCAN_THREADS threads.
+Each line is printed as soon as its bookmark is resolved, so the order of lines
+is not the one of bookmarks and a picker can show the first ones while the
+others still wait for a slow file system.
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple
+
+import workspace_bookmark
+import workspace_bookmark_registry
+
+
+def describe(
+    resolver: workspace_bookmark.WorkspaceResolver, name: str, path: str
+) -> Tuple[str, str, bool]:
+    """Return a bookmark name, the path it resolves to and whether it exists."""
+    # Names are not parsed like destinations, they may contain '/' or ':'.
+    path = workspace_bookmark.resolve(
+        path, resolver.roots(), resolver.magic_files, resolver.probes
+    )
+    return name, path, os.path.isdir(path)
+
+
+def main(argv: List[str]) -> int:
+    """Print the bookmarks of the current workspace as they are resolved."""
+    if argv:
+        print("Usage: workspace_bookmark.py --list", file=sys.stderr)
+        return 1
+    resolver = workspace_bookmark.WorkspaceResolver(os.getcwd())
+    try:
+        bookmarks = workspace_bookmark.load_bookmarks(
+            resolver.bookmarks() or workspace_bookmark.DEFAULT_BOOKMARKS
+        )
+        for warning in resolver.bookmark_warnings():
+            print(warning, file=sys.stderr, end="")
+    except workspace_bookmark.WorkspaceRootNotFoundError as exception:
+        print(exception, file=sys.stderr, end="")
+        return 1
+    threads = int(
+        resolver.environ.get(
+            "WORKSPACE_BOOKMARK_SCAN_THREADS", workspace_bookmark_registry.SCAN_THREADS
+        )
+    )
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as pool:
+        for future in as_completed(
+            [
+                pool.submit(describe, resolver, name, bookmarks[name])
+                for name in sorted(bookmarks)
+            ]
+        ):
+            name, path, exists = future.result()
+            print(f"{name}\t{path}\t{'exists' if exists else 'missing'}", flush=True)
+    return 0
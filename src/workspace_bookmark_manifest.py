@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Bookmarks generated from the repo manifest.
+
+With WORKSPACE_BOOKMARK_MANIFEST=1 every <project> of .repo/manifest.xml, its
+includes and .repo/local_manifests can be jumped to without bookmarking it:
+    g platform/frameworks/base      - goto the project by its name
+    g frameworks/base/core          - by its path, with a path appended
+    g linux-yocto                   - by the last part of its path, if unique
+WORKSPACE_BOOKMARKS take precedence over projects.
+
+Manifests are parsed incrementally, so the multi-megabyte manifests of Android
+are never held in memory as a whole. The resulting index of projects is cached
+per workspace root along with the modification times of every manifest file and
+rebuilt once any of them changes.
+"""
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import workspace_bookmark_cache
+
+# The number of workspaces for which an index of projects is kept.
+MAX_MANIFEST_INDEXES = 64
+
+
+def file_state(path: str) -> List:
+    """Return what tells whether a manifest file changed, even if it is missing."""
+    try:
+        return [os.path.realpath(path), os.stat(path).st_mtime_ns]
+    except OSError:
+        return [path, None]
+
+
+class ManifestParser:
+    """Collect projects of a manifest and of every manifest it includes."""
+
+    def __init__(self, repo: str):
+        self.repo = repo
+        self.projects: Dict[str, str] = {}
+        self.files: Dict[str, List] = {}
+
+    def parse(self, path: str):
+        """Parse a manifest file, recursing into its includes."""
+        if path in self.files:
+            return
+        self.files[path] = file_state(path)
+        try:
+            elements = list(self.elements(path))
+        except (OSError, ElementTree.ParseError):
+            # repo refuses to work with such a manifest, so should g.
+            return
+        for tag, attributes in elements:
+            if tag == "project":
+                self.projects[attributes["name"]] = attributes.get(
+                    "path", attributes["name"]
+                )
+            elif tag == "remove-project":
+                self.projects.pop(attributes["name"], None)
+            elif tag == "include":
+                self.parse(os.path.join(self.repo, "manifests", attributes["name"]))
+
+    @staticmethod
+    def elements(path: str) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """Yield tags and attributes of the elements which matter to bookmarks."""
+        for _, element in ElementTree.iterparse(path):
+            if element.tag in ("project", "remove-project", "include"):
+                if "name" in element.attrib:
+                    yield element.tag, dict(element.attrib)
+            # Keep the memory bounded no matter how large the manifest is.
+            element.clear()
+
+    def parse_local_manifests(self):
+        """Parse manifests in .repo/local_manifests, which override the main one."""
+        local = os.path.join(self.repo, "local_manifests")
+        self.files[local] = file_state(local)
+        try:
+            names = sorted(name for name in os.listdir(local) if name.endswith(".xml"))
+        except OSError:
+            return
+        for name in names:
+            self.parse(os.path.join(local, name))
+
+
+def project_keys(projects: Dict[str, str]) -> Dict[str, str]:
+    """Return paths of projects keyed by name, by path and by unique basename."""
+    basenames: Dict[str, List[str]] = {}
+    for path in projects.values():
+        basenames.setdefault(os.path.basename(path.rstrip("/")), []).append(path)
+    keys = {
+        basename: paths[0]
+        for basename, paths in basenames.items()
+        if len(set(paths)) == 1
+    }
+    keys.update((path.rstrip("/"), path) for path in projects.values())
+    keys.update(projects)
+    return keys
+
+
+def is_fresh(files: Dict[str, List]) -> bool:
+    """Tell whether none of the manifest files changed since they were parsed."""
+    return all(file_state(path) == state for path, state in files.items())
+
+
+def project_index(root: str, cache: Optional[str]) -> Dict[str, str]:
+    """Return paths of projects of the workspace root, relative to it."""
+    cache_path = None
+    if cache is not None:
+        cache_path = os.path.join(
+            cache, "manifests", workspace_bookmark_cache.digest(root) + ".json"
+        )
+        cached = workspace_bookmark_cache.read_json(cache_path, {})
+        if cached.get("root") == root and is_fresh(cached.get("files", {})):
+            return cached["projects"]
+    parser = ManifestParser(os.path.join(root, ".repo"))
+    parser.parse(os.path.join(parser.repo, "manifest.xml"))
+    parser.parse_local_manifests()
+    projects = project_keys(parser.projects)
+    if cache_path is not None:
+        workspace_bookmark_cache.write_json(
+            cache_path, {"root": root, "files": parser.files, "projects": projects}
+        )
+        workspace_bookmark_cache.forget_oldest_files(
+            os.path.dirname(cache_path), MAX_MANIFEST_INDEXES
+        )
+    return projects
+
+
+def lookup_project(
+    destination: str, root: str, cache: Optional[str]
+) -> Tuple[str, str]:
+    """
+    Return the path of the project destination starts with and the rest of it.
+
+    The longest leading part of destination naming a project wins. KeyError is
+    raised if there is none.
+    """
+    projects = project_index(root, cache)
+    segments = destination.split("/")
+    for end in range(len(segments), 0, -1):
+        key = "/".join(segments[:end])
+        if key in projects:
+            rest = "".join("/" + segment for segment in segments[end:])
+            return os.path.join(root, projects[key]), rest
+    raise KeyError(destination)
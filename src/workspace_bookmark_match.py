@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Prefix and fuzzy matching of bookmark names.
+
+When a destination isn't bookmarked under its exact name, g looks for a bookmark
+it abbreviates:
+    g bui  - goto build, the only bookmark starting with 'bui'
+    g vndr - goto vendor, the bookmark most similar to 'vndr'
+If several bookmarks match about as well the jump fails and the best candidates
+are suggested.
+
+The path appended to a bookmark may be abbreviated too, when it doesn't exist as
+it is. Each of its parts is looked up among the directories it is in: an exact
+match first, then the only one it is a prefix of, then the same two ignoring
+case.
+    g build/t/w/cortexa - goto build/tmp/work/cortexa57-poky-linux
+A part matching no directory, or several, is kept along with the rest of the
+path and cd reports the error. Listings of directories are cached briefly, see
+workspace_bookmark_complete.list_directories.
+
+WORKSPACE_BOOKMARK_MATCH selects how far the search goes: 'exact', 'prefix' or
+'fuzzy' (the default). Parts of paths are matched regardless of case unless it
+is 'prefix' and not at all if it is 'exact'.
+
+Candidates are found through a MatchIndex of sorted names, for prefixes, and of
+the trigrams of every name, for fuzzy matches. Only the handful of names sharing
+the most trigrams with the destination are compared to it. If nothing matches
+the bookmarks the destination would be sorted between are suggested instead.
+For large tables the trigrams are stored next to the BookmarkIndex of the
+table, in the same format, and both are only read where a lookup needs them.
+"""
+import bisect
+import difflib
+import itertools
+import os
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional
+
+import workspace_bookmark_cache
+import workspace_bookmark_complete
+
+# Fuzzy matches need at least that similarity, 1.0 being equal names.
+MIN_SIMILARITY = 0.6
+# The best fuzzy match is used only when the second best is less similar by that.
+MIN_LEAD = 0.1
+# The number of names compared to the destination and suggested to the user.
+MAX_CANDIDATES = 32
+MAX_SUGGESTIONS = 5
+
+
+class NoMatchError(KeyError):
+    """
+    No bookmark, or more than one, matches a name. Holds the best candidates.
+
+    Without candidates the neighbours are the bookmarks the name would be sorted
+    between, if any.
+    """
+
+    def __init__(
+        self, name: str, candidates: List[str], neighbours: Optional[List[str]] = None
+    ):
+        super().__init__(name)
+        self.candidates = candidates
+        self.neighbours = [] if neighbours is None else neighbours
+
+
+def similarity(name: str, candidate: str) -> float:
+    """Return how similar name is to candidate, from 0.0 to 1.0."""
+    return difflib.SequenceMatcher(None, name.lower(), candidate.lower()).ratio()
+
+
+def trigrams(name: str) -> List[str]:
+    """Return trigrams of a name, padded so that its beginning weighs more."""
+    padded = "  " + name.lower() + " "
+    return [padded[start:][:3] for start in range(len(padded) - 2)]
+
+
+class MatchIndex:
+    """Sorted bookmark names and the numbers of the names containing each trigram."""
+
+    def __init__(self, names: List[str], postings: Dict[str, List[int]]):
+        self.names = names
+        self.postings = postings
+
+    @classmethod
+    def build(cls, bookmarks: Mapping[str, str]) -> "MatchIndex":
+        """Index names of bookmarks."""
+        names = sorted(bookmarks)
+        postings: Dict[str, List[int]] = {}
+        for number, name in enumerate(names):
+            for trigram in set(trigrams(name)):
+                postings.setdefault(trigram, []).append(number)
+        return cls(names, postings)
+
+    def name(self, number: int) -> str:
+        """Return the name a posting refers to."""
+        return self.names[number]
+
+    def posting(self, trigram: str) -> List[int]:
+        """Return the numbers of the names containing trigram."""
+        return self.postings.get(trigram, [])
+
+    def prefixed(self, prefix: str) -> List[str]:
+        """Return names starting with prefix."""
+        start = bisect.bisect_left(self.names, prefix)
+        end = start
+        while end < len(self.names) and self.names[end].startswith(prefix):
+            end += 1
+        return self.names[start:end]
+
+    def neighbours(self, name: str) -> List[str]:
+        """Return the names around the place name would be sorted in."""
+        start = max(bisect.bisect_left(self.names, name) - MAX_SUGGESTIONS // 2, 0)
+        return self.names[start:][:MAX_SUGGESTIONS]
+
+    def similar(self, name: str) -> List[str]:
+        """Return names similar to name, the most similar first."""
+        shared: Dict[int, int] = {}
+        for trigram in set(trigrams(name)):
+            for number in self.posting(trigram):
+                shared[number] = shared.get(number, 0) + 1
+        candidates = sorted(shared, key=shared.__getitem__, reverse=True)
+        scores = {}
+        for number in candidates[:MAX_CANDIDATES]:
+            candidate = self.name(number)
+            scores[candidate] = similarity(name, candidate)
+        return [
+            candidate
+            for score, candidate in sorted(
+                (-score, candidate) for candidate, score in scores.items()
+            )
+            if -score >= MIN_SIMILARITY
+        ]
+
+
+class StoredMatchIndex(MatchIndex):
+    """
+    MatchIndex of a large table, read only partially from files.
+
+    Names are looked up in the BookmarkIndex of the table. The postings are
+    stored in the same format, with the offsets of the lines of the names in the
+    BookmarkIndex as numbers, so a miss reads a handful of lines of each. The
+    offsets of a trigram are stored as the differences between them, which
+    mostly take a few digits.
+    """
+
+    def __init__(
+        self,
+        table: workspace_bookmark_cache.BookmarkIndex,
+        postings: workspace_bookmark_cache.BookmarkIndex,
+    ):
+        super().__init__([], {})
+        self.table = table
+        self.stored_postings = postings
+
+    @staticmethod
+    def write(path: str, table: workspace_bookmark_cache.BookmarkIndex):
+        """Store the postings of the names in table."""
+        postings: Dict[str, List[int]] = {}
+        previous: Dict[str, int] = {}
+        for offset, name in table.lines():
+            for trigram in set(trigrams(name)):
+                postings.setdefault(trigram, []).append(
+                    offset - previous.get(trigram, 0)
+                )
+                previous[trigram] = offset
+        workspace_bookmark_cache.BookmarkIndex.write(path, postings)
+
+    def name(self, number: int) -> str:
+        return self.table.name_at(number)
+
+    def posting(self, trigram: str) -> List[int]:
+        return list(itertools.accumulate(self.stored_postings.get(trigram, [])))
+
+    def prefixed(self, prefix: str) -> List[str]:
+        return self.table.prefixed(prefix)
+
+    def neighbours(self, name: str) -> List[str]:
+        return self.table.neighbours(name, MAX_SUGGESTIONS)
+
+
+@lru_cache(maxsize=8)
+def match_index(bookmarks: str, directory: Optional[str]) -> MatchIndex:
+    """Return the MatchIndex of WORKSPACE_BOOKMARKS, stored once for large tables."""
+    table = workspace_bookmark_cache.bookmark_table(bookmarks, directory)
+    if directory is None or not isinstance(
+        table, workspace_bookmark_cache.BookmarkIndex
+    ):
+        return MatchIndex.build(table)
+    path = os.path.join(
+        directory, "matches", workspace_bookmark_cache.digest(bookmarks) + ".jsonl"
+    )
+    for _ in range(2):
+        try:
+            return StoredMatchIndex(table, workspace_bookmark_cache.BookmarkIndex(path))
+        except (OSError, ValueError):
+            StoredMatchIndex.write(path, table)
+    return MatchIndex.build(table)
+
+
+def match(name: str, bookmarks: str, environ: Mapping[str, str]) -> str:
+    """
+    Return the bookmark which name abbreviates.
+
+    NoMatchError is raised if there is no such bookmark or if there are several.
+    """
+    mode = environ.get("WORKSPACE_BOOKMARK_MATCH", "fuzzy")
+    # An empty name abbreviates every bookmark, e.g. in 'g /x'.
+    if mode == "exact" or not name:
+        raise NoMatchError(name, [])
+    index = match_index(bookmarks, workspace_bookmark_cache.cache_directory(environ))
+    prefixed = index.prefixed(name)
+    if len(prefixed) == 1:
+        return prefixed[0]
+    if prefixed:
+        raise NoMatchError(name, sorted(prefixed, key=len)[:MAX_SUGGESTIONS])
+    similar = [] if mode == "prefix" else index.similar(name)
+    if len(similar) == 1 or (
+        similar
+        and similarity(name, similar[0]) - similarity(name, similar[1]) >= MIN_LEAD
+    ):
+        return similar[0]
+    if similar:
+        raise NoMatchError(name, similar[:MAX_SUGGESTIONS])
+    raise NoMatchError(name, [], index.neighbours(name))
+
+
+def match_part(part: str, names: List[str], mode: str) -> Optional[str]:
+    """Return the name of a directory the part of a path abbreviates or None."""
+    if part in names:
+        return part
+    prefixed = [name for name in names if name.startswith(part)]
+    if len(prefixed) == 1:
+        return prefixed[0]
+    if prefixed or mode == "prefix":
+        return None
+    folded = part.lower()
+    equal = [name for name in names if name.lower() == folded]
+    prefixed = equal or [name for name in names if name.lower().startswith(folded)]
+    return prefixed[0] if len(prefixed) == 1 else None
+
+
+def match_path(directory: str, path: str, environ: Mapping[str, str]) -> str:
+    """Return the path below directory with the parts it abbreviates spelled out."""
+    mode = environ.get("WORKSPACE_BOOKMARK_MATCH", "fuzzy")
+    cache = workspace_bookmark_cache.cache_directory(environ)
+    parts = path.split("/")
+    for number, part in enumerate(parts):
+        if part not in ("", ".", ".."):
+            name = match_part(
+                part,
+                workspace_bookmark_complete.list_directories(directory, cache),
+                mode,
+            )
+            if name is None:
+                break
+            parts[number] = name
+        directory = os.path.join(directory, parts[number])
+    return "/".join(parts)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Prefetch of the metadata of a jump destination, for network file systems.
+
+    workspace_bookmark.py --prefetch DIRECTORY
+
+Lists DIRECTORY and the directories below it, down to WORKSPACE_BOOKMARK_PREFETCH
+levels, and stats every entry, so that the attribute and directory entry caches
+of an NFS client are warm by the time the first ls or TAB comes. Nothing is done
+unless WORKSPACE_BOOKMARK_PREFETCH is set to a number of levels, e.g. 2.
+
+After a successful jump g runs it detached in the background. Directories are
+listed by a pool of WORKSPACE_BOOKMARK_SCAN_THREADS threads, hidden ones and
+symbolic links are not descended into. A prefetch stops after
+MAX_PREFETCH_DIRECTORIES directories or PREFETCH_SECONDS seconds, whichever
+comes first. A destination prefetched less than PREFETCH_INTERVAL seconds ago,
+by this or another shell, is not prefetched again.
+"""
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Mapping, Optional
+
+import workspace_bookmark_cache
+import workspace_bookmark_registry
+
+# Budget of a single prefetch.
+MAX_PREFETCH_DIRECTORIES = 2000
+PREFETCH_SECONDS = 10
+# Seconds for which a destination is not prefetched again.
+PREFETCH_INTERVAL = 300
+# The number of destinations remembered as prefetched.
+MAX_PREFETCH_STAMPS = 256
+
+
+def warm(path: str) -> List[str]:
+    """Stat every entry of a directory and return the ones to descend into."""
+    subdirectories = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if not entry.name.startswith(".") and entry.is_dir(
+                    follow_symlinks=False
+                ):
+                    subdirectories.append(entry.path)
+    except OSError:
+        pass
+    return subdirectories
+
+
+def throttled(directory: str, cache: Optional[str]) -> bool:
+    """Tell whether directory was prefetched recently, else remember it was now."""
+    if cache is None:
+        return False
+    stamps = os.path.join(cache, "prefetch")
+    stamp = os.path.join(stamps, workspace_bookmark_cache.digest(directory))
+    try:
+        if time.time() - os.stat(stamp).st_mtime < PREFETCH_INTERVAL:
+            return True
+    except OSError:
+        pass
+    workspace_bookmark_cache.write_text(stamp, directory)
+    workspace_bookmark_cache.forget_oldest_files(stamps, MAX_PREFETCH_STAMPS)
+    return False
+
+
+def prefetch(directory: str, levels: int, environ: Mapping[str, str]) -> int:
+    """Warm directory and the ones levels below it, return how many were listed."""
+    threads = int(
+        environ.get(
+            "WORKSPACE_BOOKMARK_SCAN_THREADS", workspace_bookmark_registry.SCAN_THREADS
+        )
+    )
+    deadline = time.monotonic() + PREFETCH_SECONDS
+    listed = 0
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as pool:
+        pending = {pool.submit(warm, directory): 0}
+        submitted = 1
+        while pending:
+            done, _ = wait(
+                pending,
+                timeout=max(deadline - time.monotonic(), 0),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                # Out of time, only wait for the listings already started.
+                for future in pending:
+                    future.cancel()
+                break
+            for future in done:
+                depth = pending.pop(future)
+                listed += 1
+                if depth >= levels:
+                    continue
+                for path in future.result():
+                    if submitted >= MAX_PREFETCH_DIRECTORIES:
+                        break
+                    pending[pool.submit(warm, path)] = depth + 1
+                    submitted += 1
+    return listed
+
+
+def main(argv: List[str]) -> int:
+    """Prefetch the directory given as the argument, if enabled."""
+    if len(argv) != 1:
+        print("Usage: workspace_bookmark.py --prefetch DIRECTORY", file=sys.stderr)
+        return 1
+    try:
+        levels = int(os.environ.get("WORKSPACE_BOOKMARK_PREFETCH") or 0)
+    except ValueError:
+        print("Warning: WORKSPACE_BOOKMARK_PREFETCH is not a number.", file=sys.stderr)
+        return 1
+    directory = os.path.abspath(argv[0])
+    cache = workspace_bookmark_cache.cache_directory(os.environ)
+    if levels > 0 and not throttled(directory, cache):
+        prefetch(directory, levels, os.environ)
+    return 0
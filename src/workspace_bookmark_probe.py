@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+File system probes made concurrently and given up on after a timeout.
+
+On NFS or autofs mounts a single stale handle can block a stat or a listdir for
+a long time. With WORKSPACE_BOOKMARK_PROBE_TIMEOUT set, in seconds, g probes
+every candidate of a bookmark at once and, on the first listing of a directory,
+all of its ancestors too. A probe not answered within the timeout counts as a
+missing directory, or as an empty one when listed, and the highest priority
+answer among the rest wins.
+
+A directory whose probe timed out is remembered as hung for HUNG_TTL seconds,
+along with everything below it. Until then it is not probed again, so a hung
+mount slows down a single jump instead of every one. Other answers are only
+shared by the probes in flight, once waited for a path is probed anew.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import workspace_bookmark
+import workspace_bookmark_cache
+
+# Seconds for which a directory whose probe timed out is not probed again.
+HUNG_TTL = 30
+# The number of probes made at the same time.
+MAX_CONCURRENT_PROBES = 8
+
+
+class Probe(threading.Thread):
+    """A call of a file system function in a thread of its own."""
+
+    def __init__(
+        self, function: Callable[[str], Any], path: str, slots: threading.Semaphore
+    ):
+        # A daemon thread doesn't keep the process alive while stuck on a mount.
+        super().__init__(daemon=True)
+        self.function = function
+        self.path = path
+        self.slots = slots
+        self.running = False
+        self.result: Any = None
+        self.error: Optional[OSError] = None
+
+    def run(self):
+        with self.slots:
+            self.running = True
+            try:
+                self.result = self.function(self.path)
+            except OSError as error:
+                self.error = error
+
+
+class ConcurrentProbes(workspace_bookmark.Probes):
+    """
+    Probes made in parallel threads, each given up on after a timeout.
+
+    The probes may be shared by threads, like the WorkspaceResolver using them.
+    """
+
+    def __init__(self, timeout: float, cache: Optional[str] = None):
+        self.timeout = timeout
+        self.slots = threading.Semaphore(MAX_CONCURRENT_PROBES)
+        # Probes started and not waited for yet.
+        self.probes: Dict[tuple, Probe] = {}
+        self.path = None if cache is None else os.path.join(cache, "hung.json")
+        self.hung: Dict[str, float] = {}
+        # Guards probes and hung.
+        self.lock = threading.RLock()
+        if self.path is not None:
+            self.hung = {
+                path: until
+                for path, until in workspace_bookmark_cache.read_json(
+                    self.path, {}
+                ).items()
+                if until > time.time()
+            }
+
+    def is_hung(self, path: str) -> bool:
+        """Tell whether path is, or is below, a directory which recently hung."""
+        now = time.time()
+        with self.lock:
+            return any(
+                until > now and (path == hung or path.startswith(hung + "/"))
+                for hung, until in self.hung.items()
+            )
+
+    def start(self, function: Callable[[str], Any], path: str) -> Probe:
+        """Start probing path with function unless it is already being probed."""
+        key = (function.__name__, path)
+        with self.lock:
+            if key in self.probes:
+                return self.probes[key]
+            probe = Probe(function, path, self.slots)
+            # A probe of a hung path is never started nor shared.
+            if not self.is_hung(path):
+                probe.start()
+                self.probes[key] = probe
+            return probe
+
+    def wait(self, probe: Probe, default: Any) -> Any:
+        """Return the result of a probe, or default if it doesn't come in time."""
+        if probe.ident is None or self.is_hung(probe.path):
+            return default
+        probe.join(self.timeout)
+        if probe.is_alive():
+            # A probe still waiting for a free slot tells nothing about its path.
+            if probe.running:
+                with self.lock:
+                    self.hung[probe.path] = time.time() + HUNG_TTL
+                    hung = dict(self.hung)
+                if self.path is not None:
+                    workspace_bookmark_cache.write_json(self.path, hung)
+            return default
+        with self.lock:
+            key = (probe.function.__name__, probe.path)
+            if self.probes.get(key) is probe:
+                del self.probes[key]
+        if probe.error is not None:
+            raise probe.error
+        return probe.result
+
+    def listdir(self, path: str) -> List[str]:
+        """Return names of entries in a directory, listing its ancestors too."""
+        directory = path
+        while directory:
+            self.start(os.listdir, directory)
+            directory = "/".join(directory.split("/")[:-1])
+        return self.wait(self.start(os.listdir, path), [])
+
+    def isdir(self, path: str) -> bool:
+        """Tell whether path is a directory, False if it doesn't answer in time."""
+        return self.wait(self.start(os.path.isdir, path), False)
+
+    def first_directory(self, candidates: Iterable[str]) -> Optional[str]:
+        """Return the first of candidates which is a directory or None."""
+        probes = [self.start(os.path.isdir, candidate) for candidate in candidates]
+        for probe in probes:
+            if self.wait(probe, False):
+                return probe.path
+        return None
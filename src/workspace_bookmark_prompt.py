@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Segment of a shell prompt telling the workspace and the path in it.
+
+    workspace_bookmark.py --prompt
+
+Prints 'WORKSPACE/PATH' for the current directory, WORKSPACE being the name of
+the workspace in the registry, see workspace_bookmark_registry, or else the last
+part of its root, and PATH the current directory relative to the root. Outside
+of a workspace nothing is printed. The exit code is always 0.
+
+The root found from a directory, or that there is none, is cached per directory
+along with the mtimes of the directory and its ancestors. Creating or removing a
+magic file changes the mtime of the directory it is in, so the next prompt
+walks up again. Otherwise a prompt costs a stat per ancestor. The resolver
+daemon answers prompts too, see g_prompt in setup.sh.
+"""
+import os
+import sys
+
+import workspace_bookmark
+import workspace_bookmark_cache
+
+# Like in workspace_bookmark, typing is only imported by type checkers to keep
+# every prompt fast.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import List, Mapping, Optional
+
+# The number of directories for which the root is cached.
+MAX_PROMPT_ENTRIES = 1024
+
+
+def ancestors(directory: str) -> "List[str]":
+    """Return directory and its ancestors, like find_workspace_roots visits them."""
+    directories = []
+    while directory:
+        directories.append(directory)
+        directory = "/".join(directory.split("/")[:-1])
+    return directories
+
+
+def mtimes(directories: "List[str]") -> "Optional[List[int]]":
+    """Return mtimes of directories or None if one of them is gone."""
+    try:
+        return [os.stat(directory).st_mtime_ns for directory in directories]
+    except OSError:
+        return None
+
+
+def entry_path(directory: str, cache: str) -> "Optional[str]":
+    """Return the path of the cache entry of directory, if it can have one."""
+    name = workspace_bookmark_cache.escaped_name(directory, ".json")
+    return None if name is None else os.path.join(cache, "prompt", name)
+
+
+def workspace_root(directory: str, environ: "Mapping[str, str]") -> "Optional[str]":
+    """Return the root of the workspace directory is in or None."""
+    magic_files = workspace_bookmark.get_magic_files(environ)
+    cache = workspace_bookmark_cache.cache_directory(environ)
+    path = None if cache is None else entry_path(directory, cache)
+    state = {"magic": magic_files, "mtimes": mtimes(ancestors(directory))}
+    if path is not None:
+        cached = workspace_bookmark_cache.read_json(path, {})
+        if all(cached.get(key) == value for key, value in state.items()):
+            return cached["root"]
+    roots = workspace_bookmark.find_workspace_roots(magic_files, directory)
+    root = next((roots[name] for name in magic_files if name in roots), None)
+    if path is not None and state["mtimes"] is not None:
+        workspace_bookmark_cache.write_json(path, dict(state, root=root))
+        workspace_bookmark_cache.forget_oldest_files(
+            os.path.dirname(path), MAX_PROMPT_ENTRIES
+        )
+    return root
+
+
+def workspace_name(root: str, environ: "Mapping[str, str]") -> str:
+    """Return the name of the workspace at root."""
+    cache = workspace_bookmark_cache.cache_directory(environ)
+    if cache is not None:
+        registry = workspace_bookmark_cache.read_json(
+            os.path.join(cache, "registry.json"), {}
+        )
+        for name, registered in registry.items():
+            if registered == root:
+                return name
+    return os.path.basename(root) or root
+
+
+def prompt(environ: "Mapping[str, str]", cwd: "Optional[str]" = None) -> str:
+    """Return the prompt segment for cwd, with a newline, or an empty string."""
+    directory = os.getcwd() if cwd is None else cwd
+    root = workspace_root(directory, environ)
+    if root is None:
+        return ""
+    relative = os.path.relpath(directory, root)
+    name = workspace_name(root, environ)
+    return (name if relative == "." else f"{name}/{relative}") + "\n"
+
+
+def main(argv: "List[str]") -> int:
+    """Print the prompt segment for the current directory."""
+    if argv:
+        print("Usage: workspace_bookmark.py --prompt", file=sys.stderr)
+        return 1
+    print(prompt(os.environ), end="")
+    return 0
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Registry of the workspaces on this machine, for jumps between them.
+
+    workspace_bookmark.py --scan
+
+Scans WORKSPACE_BOOKMARK_BASES, a ':' separated list of directories, for
+workspace roots, i.e. directories containing .repo or one of
+WORKSPACE_BOOKMARK_MAGIC_FILE, and prints the registered workspaces. Once
+registered a workspace can be jumped into from anywhere:
+    g android-13:build - goto poky/build of the workspace named android-13
+A workspace is named by the last part of its path or, if other workspaces share
+it, by as many trailing parts as needed to tell it apart, e.g. 'a/android'.
+
+Directories are scanned by a pool of threads, WORKSPACE_BOOKMARK_SCAN_THREADS of
+them, down to WORKSPACE_BOOKMARK_SCAN_DEPTH levels below a base. A scan doesn't
+descend into workspaces, hidden directories or symbolic links. Each scanned
+directory is remembered along with its mtime so that the next scan lists only
+the directories which changed since. A jump to a workspace which isn't
+registered scans again before giving up, unless the last scan was less than
+RESCAN_INTERVAL seconds ago. Without WORKSPACE_BOOKMARK_BASES nothing is scanned
+and the registry of the last scan is kept.
+"""
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import workspace_bookmark
+import workspace_bookmark_cache
+
+# Defaults of WORKSPACE_BOOKMARK_SCAN_THREADS and WORKSPACE_BOOKMARK_SCAN_DEPTH.
+SCAN_THREADS = 8
+SCAN_DEPTH = 4
+# Seconds within which a jump to an unknown workspace doesn't scan again.
+RESCAN_INTERVAL = 60
+
+
+def visit(
+    path: str, previous: Optional[List], magic_files: List[str]
+) -> Optional[List]:
+    """
+    Return [mtime, is a workspace root, subdirectories] of a directory.
+
+    The previous result is reused if the directory didn't change since.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    if previous is not None and previous[0] == mtime:
+        return previous
+    is_root, subdirectories = False, []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name in magic_files:
+                    is_root = True
+                elif not entry.name.startswith(".") and entry.is_dir(
+                    follow_symlinks=False
+                ):
+                    subdirectories.append(entry.name)
+    except OSError:
+        return None
+    return [mtime, is_root, sorted(subdirectories)]
+
+
+class Scanner:
+    """Scan directories for workspace roots with a pool of threads."""
+
+    def __init__(self, magic_files: List[str], previous: Dict[str, List]):
+        self.magic_files = magic_files
+        self.previous = previous
+        self.directories: Dict[str, List] = {}
+        self.pending: Dict[Future, Tuple[str, int]] = {}
+
+    def submit(self, pool: ThreadPoolExecutor, path: str, depth: int):
+        """Visit a directory in the pool."""
+        future = pool.submit(visit, path, self.previous.get(path), self.magic_files)
+        self.pending[future] = (path, depth)
+
+    def scan(self, bases: List[str], environ: Mapping[str, str]) -> Dict[str, List]:
+        """Return the results of visit for every directory reached from bases."""
+        threads = int(environ.get("WORKSPACE_BOOKMARK_SCAN_THREADS", SCAN_THREADS))
+        max_depth = int(environ.get("WORKSPACE_BOOKMARK_SCAN_DEPTH", SCAN_DEPTH))
+        with ThreadPoolExecutor(max_workers=max(threads, 1)) as pool:
+            for base in bases:
+                self.submit(pool, base, 0)
+            while self.pending:
+                done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, depth = self.pending.pop(future)
+                    directory = future.result()
+                    if directory is None:
+                        continue
+                    self.directories[path] = directory
+                    _, is_root, subdirectories = directory
+                    if is_root or depth >= max_depth:
+                        continue
+                    for name in subdirectories:
+                        self.submit(pool, os.path.join(path, name), depth + 1)
+        return self.directories
+
+
+def name_workspaces(roots: List[str]) -> Dict[str, str]:
+    """Name each workspace root by the shortest unique tail of its path."""
+    parts = {root: root.rstrip("/").split("/") for root in roots}
+    names = {}
+    for root, path in parts.items():
+        for length in range(1, len(path) + 1):
+            tail = path[-length:]
+            if sum(1 for other in parts.values() if other[-length:] == tail) < 2:
+                break
+        names["/".join(tail)] = root
+    return names
+
+
+def get_bases(environ: Mapping[str, str]) -> List[str]:
+    """Return the directories of WORKSPACE_BOOKMARK_BASES."""
+    return [
+        os.path.abspath(os.path.expanduser(base))
+        for base in environ.get("WORKSPACE_BOOKMARK_BASES", "").split(":")
+        if base
+    ]
+
+
+def workspaces_below(
+    directories: List[str], environ: Mapping[str, str]
+) -> Dict[str, str]:
+    """Return workspaces below directories by name, without registering them."""
+    scanned = Scanner(workspace_bookmark.get_magic_files(environ), {}).scan(
+        [os.path.abspath(directory) for directory in directories], environ
+    )
+    return name_workspaces(
+        sorted(path for path, directory in scanned.items() if directory[1])
+    )
+
+
+def update(environ: Mapping[str, str], cache: str) -> Dict[str, str]:
+    """Scan for workspaces, store the registry and return it."""
+    bases = get_bases(environ)
+    registry_path = os.path.join(cache, "registry.json")
+    if not bases:
+        return workspace_bookmark_cache.read_json(registry_path, {})
+    magic_files = workspace_bookmark.get_magic_files(environ)
+    scan_path = os.path.join(cache, "registry-scan.json")
+    state = workspace_bookmark_cache.read_json(scan_path, {})
+    # Results of a scan for other magic files tell nothing about workspace roots.
+    previous = state.get("directories", {}) if state.get("magic") == magic_files else {}
+    directories = Scanner(magic_files, previous).scan(bases, environ)
+    workspaces = name_workspaces(
+        sorted(path for path, directory in directories.items() if directory[1])
+    )
+    workspace_bookmark_cache.write_json(
+        scan_path, {"magic": magic_files, "directories": directories}
+    )
+    workspace_bookmark_cache.write_json(registry_path, workspaces)
+    return workspaces
+
+
+def locate(name: str, environ: Mapping[str, str]) -> str:
+    """Return the root of the registered workspace called name or raise KeyError."""
+    cache = workspace_bookmark_cache.cache_directory(environ)
+    if cache is None:
+        raise KeyError(name)
+    registry_path = os.path.join(cache, "registry.json")
+    workspaces = workspace_bookmark_cache.read_json(registry_path, {})
+    if name not in workspaces:
+        try:
+            scanned = time.time() - os.stat(registry_path).st_mtime
+        except OSError:
+            scanned = RESCAN_INTERVAL
+        if scanned >= RESCAN_INTERVAL:
+            workspaces = update(environ, cache)
+    return workspaces[name]
+
+
+def main(argv: List[str]) -> int:
+    """Scan for workspaces and print the registry."""
+    if argv:
+        print("Usage: workspace_bookmark.py --scan", file=sys.stderr)
+        return 1
+    cache = workspace_bookmark_cache.cache_directory()
+    if cache is None:
+        print(
+            "Warning: The registry is kept among caches, which are disabled.",
+            file=sys.stderr,
+        )
+        return 1
+    for name, root in sorted(update(os.environ, cache).items()):
+        print(f"{name}\t{root}")
+    return 0
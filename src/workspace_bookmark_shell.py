@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Bookmarks compiled into a shell function, so that most jumps don't start Python.
+
+    workspace_bookmark.py --emit-shell bash|zsh
+
+Prints the definition of _g_fast, which resolves a destination like
+workspace_bookmark.py does, without leaving the shell: a case statement of
+WORKSPACE_BOOKMARKS and a walk up from $PWD testing for each of the magic files
+with [ -e ]. On success it sets _g_fast_path and returns 0. Whatever it doesn't
+handle makes it return 255 so that g asks Python instead:
+    - bookmarks with optional segments, absolute paths or '..'
+    - destinations which are not bookmarked, or which are another workspace,
+      the history or a '**' search
+    - workspaces with a .workspace-bookmarks.json file
+    - paths appended to a bookmark which don't exist, they may be abbreviated
+setup.sh evaluates the definition when WORKSPACE_BOOKMARK_SHELL is set and again
+whenever WORKSPACE_BOOKMARKS or WORKSPACE_BOOKMARK_MAGIC_FILE change.
+
+Jumps made by _g_fast are not remembered in the history nor traced and paths are
+the ones of $PWD, which may contain symbolic links.
+"""
+import os
+import sys
+from typing import Dict, List, Mapping, Optional
+
+import workspace_bookmark
+
+
+def quote(text: str) -> str:
+    """Return text quoted for the shell."""
+    return "'" + text.replace("'", "'\\''") + "'"
+
+
+def shell_path(path: str) -> Optional[str]:
+    """Return a bookmarked path relative to a root or None if Python is needed."""
+    if "{" in path or "}" in path or os.path.isabs(path):
+        return None
+    path = os.path.normpath(path)
+    if path.split("/")[0] == "..":
+        return None
+    return "" if path == "." else path
+
+
+def emit(bookmarks: Mapping[str, str], magic_files: List[str], shell: str) -> str:
+    """Return the definition of _g_fast resolving bookmarks in the given shell."""
+    paths: Dict[str, str] = {}
+    for name, path in sorted(bookmarks.items()):
+        relative = shell_path(path)
+        if name and "/" not in name and ":" not in name and relative is not None:
+            paths[name] = relative
+    cases = "".join(
+        f"\t\t{quote(name)}) path={quote(path)} ;;\n" for name, path in paths.items()
+    )
+    markers = " ".join(quote(magic_file) for magic_file in magic_files)
+    emulate = "\temulate -L sh\n" if shell == "zsh" else ""
+    return f"""_g_fast () {{
+{emulate}\tlocal name rest path marker directory root found
+\tcase "$1" in
+\t\t*:*|-|@*|'**'|'**/'*|*'/**'*) return 255 ;;
+\tesac
+\tname="${{1%%/*}}"
+\trest=""
+\tcase "$1" in
+\t\t*/*) rest="/${{1#*/}}" ;;
+\tesac
+\tcase "$name" in
+\t\t'') [ -z "$rest" ] || return 255; path="" ;;
+{cases}\t\t*) return 255 ;;
+\tesac
+\tfound=""
+\troot=""
+\tfor marker in {markers}
+\tdo
+\t\tdirectory="$PWD"
+\t\twhile [ -n "$directory" ] && [ ! -e "$directory/$marker" ]
+\t\tdo
+\t\t\tdirectory="${{directory%/*}}"
+\t\tdone
+\t\t[ -n "$directory" ] || continue
+\t\t[ -e "$directory/.workspace-bookmarks.json" ] && return 255
+\t\troot="$directory${{path:+/$path}}"
+\t\tif [ -z "$found" ] && [ -d "$root" ]
+\t\tthen
+\t\t\tfound="$root"
+\t\tfi
+\tdone
+\t[ -n "$root" ] || return 255
+\t[ -z "$rest" ] || [ -d "${{found:-$root}}$rest" ] || return 255
+\t_g_fast_path="${{found:-$root}}$rest"
+}}
+"""
+
+
+def main(argv: List[str]) -> int:
+    """Print the definition of _g_fast for the shell given as the argument."""
+    if argv not in (["bash"], ["zsh"]):
+        print("Usage: workspace_bookmark.py --emit-shell bash|zsh", file=sys.stderr)
+        return 1
+    try:
+        bookmarks = workspace_bookmark.load_bookmarks(
+            os.environ.get("WORKSPACE_BOOKMARKS", "{}")
+        )
+    except ValueError as error:
+        print(f"Warning: Can't parse WORKSPACE_BOOKMARKS: {error}", file=sys.stderr)
+        return 1
+    print(
+        emit(bookmarks, workspace_bookmark.get_magic_files(os.environ), argv[0]),
+        end="",
+    )
+    return 0
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Tracing of jumps, to find out where the time goes.
+
+With WORKSPACE_BOOKMARK_TRACE set to a path every jump appends a JSON line to
+that file with:
+    time - when the jump started, in seconds since the epoch
+    destination, status - what was asked for and the exit code
+    startup_ms - CPU time used by the process before the jump, which for a
+        single run is mostly the start of the interpreter and for a jump
+        answered by the daemon the time since the request came in
+    phases - milliseconds spent finding the workspace roots, looking up the
+        bookmark and resolving its candidates
+    total_ms - milliseconds from the start of the jump to its end
+    listed, stated - the number of directories listed and checked for existence
+    tier - the number of candidates of the bookmark tried before the one it
+        resolved to, 0 being the most preferred one, see resolve
+    cache - 'hit', 'miss' or 'off' for the root cache and the bookmark index
+
+    workspace_bookmark.py --stats [TRACE]
+
+Summarizes a trace with p50, p95 and p99 of the timings and cache hit rates.
+"""
+import json
+import math
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+import workspace_bookmark
+import workspace_bookmark_cache
+
+
+class Trace(workspace_bookmark.Probes):
+    """Probes which record what they did, along with timings of a jump."""
+
+    # CPU time of the process when the request being answered came in, see
+    # request_received. A single run starts at 0.
+    request_cpu_time = 0.0
+
+    def __init__(self, probes: workspace_bookmark.Probes, environ: Mapping[str, str]):
+        self.probes = probes
+        self.path = environ["WORKSPACE_BOOKMARK_TRACE"]
+        self.start = self.last = time.perf_counter()
+        cache = workspace_bookmark_cache.cache_directory(environ)
+        index = workspace_bookmark_cache.bookmark_index_path(
+            environ.get("WORKSPACE_BOOKMARKS", "{}"), cache
+        )
+        index_state = "off"
+        if index is not None:
+            index_state = "hit" if os.path.exists(index) else "miss"
+        self.record: Dict[str, Any] = {
+            "time": time.time(),
+            "startup_ms": (time.process_time() - self.request_cpu_time) * 1000,
+            "phases": {},
+            "listed": 0,
+            "stated": 0,
+            "tier": None,
+            # Roots are a hit until a directory has to be listed.
+            "cache": {
+                "roots": "off" if cache is None else "hit",
+                "bookmarks": index_state,
+            },
+        }
+
+    def listdir(self, path: str) -> List[str]:
+        self.record["listed"] += 1
+        if self.record["cache"]["roots"] == "hit":
+            self.record["cache"]["roots"] = "miss"
+        return self.probes.listdir(path)
+
+    def isdir(self, path: str) -> bool:
+        self.record["stated"] += 1
+        return self.probes.isdir(path)
+
+    def first_directory(self, candidates: Iterable[str]) -> Optional[str]:
+        tried = []
+
+        def trying() -> Iterator[str]:
+            for candidate in candidates:
+                tried.append(candidate)
+                yield candidate
+
+        found = self.probes.first_directory(trying())
+        # Concurrent probes start on every candidate but stop waiting at the
+        # one found.
+        tier = len(tried) if found is None else tried.index(found)
+        self.record["stated"] += tier + (found is not None)
+        self.record["tier"] = tier
+        return found
+
+    def phase(self, name: str):
+        now = time.perf_counter()
+        self.record["phases"][name] = (now - self.last) * 1000
+        self.last = now
+
+    def finish(self, destination: str, status: int):
+        self.record.update(
+            destination=destination,
+            status=status,
+            total_ms=(time.perf_counter() - self.start) * 1000,
+        )
+        try:
+            with open(self.path, "a", encoding="utf-8") as trace:
+                trace.write(json.dumps(self.record) + "\n")
+        except OSError:
+            pass
+
+
+def request_received():
+    """Time startup_ms of jumps from now on, for a daemon answering a request."""
+    Trace.request_cpu_time = time.process_time()
+
+
+def read_trace(path: str) -> List[Dict[str, Any]]:
+    """Return records of a trace, skipping lines which are not complete."""
+    records = []
+    with open(path, encoding="utf-8") as trace:
+        for line in trace:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the nearest rank percentile of values."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def summarize(records: List[Dict[str, Any]]) -> List[str]:
+    """Return lines of a report on latencies and cache hit rates of records."""
+    timings: Dict[str, List[float]] = {"total": [], "startup": []}
+    for record in records:
+        timings["total"].append(record["total_ms"])
+        timings["startup"].append(record["startup_ms"])
+        for phase, milliseconds in record["phases"].items():
+            timings.setdefault(phase, []).append(milliseconds)
+    lines = [f"{len(records)} jumps", f"{'ms':<10} {'p50':>8} {'p95':>8} {'p99':>8}"]
+    for name, values in timings.items():
+        lines.append(
+            f"{name:<10}"
+            + "".join(f" {percentile(values, q):8.2f}" for q in (0.5, 0.95, 0.99))
+        )
+    for cache in ("roots", "bookmarks"):
+        used = [record["cache"][cache] for record in records]
+        used = [state for state in used if state != "off"]
+        if used:
+            hits = used.count("hit") / len(used) * 100
+            lines.append(f"{cache} cache hits: {hits:.0f}% of {len(used)}")
+    return lines
+
+
+def main(argv: List[str]) -> int:
+    """Print a summary of the trace given as the argument or being written."""
+    path = argv[0] if argv else os.environ.get("WORKSPACE_BOOKMARK_TRACE")
+    if not path:
+        print("Usage: workspace_bookmark.py --stats [TRACE]", file=sys.stderr)
+        return 1
+    try:
+        records = read_trace(path)
+    except OSError as error:
+        print(f"Warning: Can't read the trace: {error}", file=sys.stderr)
+        return 1
+    if not records:
+        print("Warning: The trace is empty.", file=sys.stderr)
+        return 1
+    for line in summarize(records):
+        print(line)
+    return 0